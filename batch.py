@@ -0,0 +1,175 @@
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from main import STAGES, skip_options
+from crawler.extract_comments import scrape_recent_episodes
+from sentiment.sentiment_predictor import init_classifier_worker
+from stage_manifest import StageManifest, run_stage
+from db import pool_stats
+from visualize import render
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def parse_episodes(text):
+    """'150-160' 또는 '150,152,155' 형식의 회차 목록을 list로 변환"""
+    episodes = []
+    for part in text.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            episodes.extend(range(int(start), int(end) + 1))
+        else:
+            episodes.append(int(part))
+    return episodes
+
+def load_manifest(file_path):
+    """
+    작업 목록 파일을 읽어 (title, episode) list로 반환한다.
+    JSON: [{"title": "김부장", "episode": 167}, {"title": "김부장", "episodes": "160-166"}, ...]
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    jobs = []
+    for entry in entries:
+        if "episodes" in entry:
+            jobs.extend((entry["title"], episode) for episode in parse_episodes(str(entry["episodes"])))
+        else:
+            jobs.append((entry["title"], int(entry["episode"])))
+    return jobs
+
+
+class BatchScheduler:
+    """
+    여러 (title, episode) 작업을 stage 단위로 실행한다.
+    작업은 io_workers개까지 동시에 진행되므로 수집, DB 적재, 리포트 같은 I/O stage는 서로 겹쳐서 실행되고,
+    전처리, 시각화 같은 CPU stage는 cpu_workers개의 process pool을 모든 작업이 나눠 쓴다.
+    """
+
+    def __init__(self, io_workers=8, cpu_workers=2, options=None, force=()):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.options = options or {}
+        self.force = force
+        self.manifest = StageManifest()
+        self._print_lock = threading.Lock()
+
+    def _status(self, message):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def collect_episode_lists(self, io_pool, jobs):
+        """
+        웹툰마다 회차 목록(EPISODE_DATA_DIR/<title>.json)을 작업 시작 전에 한 번만 수집한다.
+        같은 웹툰의 작업들이 회차 목록 파일을 동시에 다시 쓰지 않도록 crawl stage에서는 수집하지 않는다.
+        """
+        if self.options.get("episodes_collected"):
+            return
+        titles = list(dict.fromkeys(title for title, _ in jobs))
+        for title, future in [(title, io_pool.submit(scrape_recent_episodes, title)) for title in titles]:
+            try:
+                future.result()
+            except Exception as e:
+                self._status(f"[FAIL] {title} 회차 목록 수집 - {e}")
+        self.options = {**self.options, "episodes_collected": True}
+
+    def run_job(self, cpu_pool, title, episode):
+        """한 작업의 stage를 순서대로 실행하고 (성공 여부, stage별 소요 시간, 오류)를 반환"""
+        timings = {}
+        options = self.options
+        for name, _, stage, kind in STAGES:
+            started = time.perf_counter()
+            runner = (lambda fn, *args: cpu_pool.submit(fn, *args).result()) if kind == "cpu" else None
+            try:
+                ran = run_stage(self.manifest, name, stage, title, episode, options, self.force, runner)
+            except Exception as e:
+                self._status(f"[FAIL] {title} {episode}화 - {name}: {e}")
+                return False, timings, f"{name}: {e}"
+            if not ran:
+                self._status(f"[{name.upper()}] {title} {episode}화 변경 없음, 건너뜀")
+                options = skip_options(name, options)
+                continue
+            timings[name] = time.perf_counter() - started
+            self._status(f"[{name.upper()}] {title} {episode}화 완료 ({timings[name]:.1f}s)")
+
+        self._status(f"[DONE] {title} {episode}화 ({sum(timings.values()):.1f}s)")
+        return True, timings, None
+
+    def run(self, jobs):
+        """모든 작업을 실행하고 처리량 요약을 출력"""
+        started = time.perf_counter()
+        results = []
+        # CPU stage가 수집 thread를 물려받지 않도록 spawn 사용
+        # worker마다 감성 분석 모델을 한 번만 로드해 여러 회차의 전처리에서 재사용하고, torch thread는 core를 나눠 사용
+        num_threads = max(1, (os.cpu_count() or 1) // self.cpu_workers)
+        with ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_classifier_worker, initargs=(num_threads,)) as cpu_pool, \
+                ThreadPoolExecutor(max_workers=self.io_workers) as io_pool:
+            self.collect_episode_lists(io_pool, jobs)
+            futures = {io_pool.submit(self.run_job, cpu_pool, title, episode): (title, episode) for title, episode in jobs}
+            for future in as_completed(futures):
+                title, episode = futures[future]
+                results.append((title, episode, *future.result()))
+        # 이 process에서 렌더링 pool을 만들었으면 종료 (CPU worker 안의 시각화는 pool 없이 직접 그림)
+        render.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.print_summary(results, elapsed)
+        return results
+
+    def print_summary(self, results, elapsed):
+        succeeded = [r for r in results if r[2]]
+        failed = [r for r in results if not r[2]]
+
+        print("\n===== 배치 처리 결과 =====")
+        print(f"전체 작업: {len(results)}개 / 성공: {len(succeeded)}개 / 실패: {len(failed)}개")
+        print(f"총 소요 시간: {elapsed:.1f}s")
+        if elapsed > 0:
+            print(f"처리량: {len(succeeded) / elapsed * 60:.2f} 회차/분")
+        for name, *_ in STAGES:
+            stage_times = [r[3][name] for r in results if name in r[3]]
+            if stage_times:
+                print(f"- {name}: 평균 {sum(stage_times) / len(stage_times):.1f}s")
+        stats = pool_stats()
+        if stats["checkouts"]:
+            # 시각화는 CPU worker process의 pool을 사용하므로 이 통계에는 포함되지 않는다.
+            print(f"DB connection pool (I/O stage만 집계): checkout {stats['checkouts']}회, "
+                  f"대기 평균 {stats['wait_avg_ms']}ms / 최대 {stats['wait_max_ms']}ms, "
+                  f"사용 평균 {stats['checkout_avg_ms']}ms / 최대 {stats['checkout_max_ms']}ms")
+        for title, episode, _, _, error in failed:
+            print(f"[FAIL] {title} {episode}화 - {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 웹툰/회차를 한 번에 처리하는 배치 파이프라인")
+    parser.add_argument("--manifest", help="작업 목록 JSON 파일 경로")
+    parser.add_argument("--title", help="웹툰 제목 (--episodes와 함께 사용)")
+    parser.add_argument("--episodes", help="회차 범위 (예: 150-160 또는 150,152)")
+    parser.add_argument("--io-workers", type=int, default=8, help="동시에 진행할 작업 수")
+    parser.add_argument("--cpu-workers", type=int, default=2, help="전처리/시각화 process 수")
+    parser.add_argument("--engine", choices=["selenium", "api"], default="selenium", help="댓글 수집 방식")
+    parser.add_argument("--stream", action="store_true", help="페이지마다 댓글을 추출하여 브라우저 메모리를 일정하게 유지 (selenium)")
+    parser.add_argument("--incremental", action="store_true", help="마지막 수집 이후 새로 달린 댓글만 수집하여 기존 파일에 병합")
+    parser.add_argument("--pipeline", action="store_true", help="댓글 수집과 감성 분석을 동시에 진행")
+    parser.add_argument("--force", action="append", default=[], choices=[name for name, *_ in STAGES] + ["all"],
+                        help="입력이 바뀌지 않았어도 다시 실행할 stage (여러 번 지정 가능, all은 전체)")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest) if args.manifest else []
+    if args.title and args.episodes:
+        jobs.extend((args.title, episode) for episode in parse_episodes(args.episodes))
+    if not jobs:
+        parser.error("--manifest 또는 --title/--episodes를 지정해야 합니다.")
+
+    log(f"총 {len(jobs)}개 작업 시작")
+    options = {"workers": 1, "engine": args.engine, "stream": args.stream, "incremental": args.incremental,
+               "pipeline": args.pipeline}
+    BatchScheduler(args.io_workers, args.cpu_workers, options, args.force).run(jobs)
+
+if __name__ == '__main__':
+    main()
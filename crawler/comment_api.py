@@ -0,0 +1,200 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from crawler.extract_comments import load_webtoon_info, save_raw_comments
+from crawler.crawl_state import (get_high_water_mark, save_high_water_mark, is_seen, merge_comments,
+                                 load_existing_comments, comment_key)
+
+load_dotenv()
+
+# 전역 변수 설정
+# 로컬 stand-in server(fixture_server.py)로 테스트할 때는 환경 변수로 URL을 바꿔서 사용
+COMMENT_API_URL = os.getenv('COMMENT_API_URL', 'https://apis.naver.com/commentBox/cbox/web_naver_list_jsonp.json')
+ARTICLE_INFO_API_URL = os.getenv('ARTICLE_INFO_API_URL', 'https://comic.naver.com/api/article/list/info')
+USER_ACTION_API_URL = os.getenv('USER_ACTION_API_URL', 'https://comic.naver.com/api/userAction/info')
+LIKE_API_URL = os.getenv('LIKE_API_URL', 'https://comic.like.naver.com/v1/search/contents')
+COMMENT_API_CONCURRENCY = int(os.getenv('COMMENT_API_CONCURRENCY', 8))
+COMMENT_API_PAGE_SIZE = 100
+HEADERS = {'User-agent': 'Mozilla/5.0'}
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def create_session(concurrency=COMMENT_API_CONCURRENCY):
+    """keep-alive 연결을 재사용하고, 429/5xx 응답은 backoff 후 재시도하는 HTTP session 생성"""
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET'])
+    )
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def parse_jsonp(text):
+    """JSONP(`_callback({...});`) 또는 일반 JSON 응답을 dict로 변환"""
+    match = re.match(r'^[^(]*?\((.*)\)\s*;?\s*$', text, re.DOTALL)
+    return json.loads(match.group(1) if match else text)
+
+def fetch_comment_page(session, webtoon_id, episode, page):
+    """댓글 API에서 최신순으로 한 페이지를 가져온다."""
+    params = {
+        "ticket": "comic",
+        "templateId": "webtoon",
+        "pool": "cbox3",
+        "lang": "ko",
+        "country": "KR",
+        "objectId": f"{webtoon_id}_{episode}",
+        "pageSize": COMMENT_API_PAGE_SIZE,
+        "indexSize": 10,
+        "page": page,
+        "sort": "NEW"
+    }
+    referer = f"https://comic.naver.com/webtoon/detail?titleId={webtoon_id}&no={episode}"
+    response = session.get(COMMENT_API_URL, params=params, headers={"Referer": referer}, timeout=10)
+    response.raise_for_status()
+    return parse_jsonp(response.text)["result"]
+
+def to_raw_comment(comment):
+    """API 댓글 항목을 Selenium 수집 결과와 같은 형식으로 변환"""
+    return {
+        "nickname": comment.get("userName", ""),
+        "text": comment.get("contents", ""),
+        "recomm": str(comment.get("sympathyCount", 0)),
+        "unrecomm": str(comment.get("antipathyCount", 0)),
+        "date": comment.get("regTime", "")
+    }
+
+def fetch_episode_info(session, webtoon_id, episode):
+    """관심웹툰 등록자수, 좋아요 수, 별점을 Selenium 수집 결과와 같은 문자열 형식으로 가져온다."""
+    interest_count, like_count, rating = "0", "0", "0"
+    try:
+        info = session.get(ARTICLE_INFO_API_URL, params={"titleId": webtoon_id}, timeout=10).json()
+        interest_count = f"{info.get('favoriteCount', 0):,}"
+    except (requests.RequestException, ValueError):
+        log("관심웹툰 등록자수를 가져오지 못했습니다.")
+    try:
+        like_info = session.get(LIKE_API_URL, params={"q": f"COMIC[{webtoon_id}_{episode}]"}, timeout=10).json()
+        reactions = like_info.get("contents", [{}])[0].get("reactions", [])
+        like_count = f"{sum(r.get('count', 0) for r in reactions if r.get('reactionType') == 'like'):,}"
+    except (requests.RequestException, ValueError, IndexError):
+        log("좋아요 수를 가져오지 못했습니다.")
+    try:
+        action_info = session.get(USER_ACTION_API_URL, params={"titleId": webtoon_id, "no": episode}, timeout=10).json()
+        rating = f"{action_info.get('starInfo', {}).get('averageStarScore', 0):.2f}"
+    except (requests.RequestException, ValueError):
+        log("별점을 가져오지 못했습니다.")
+    return interest_count, like_count, rating
+
+def page_comments(page):
+    """API 응답 한 페이지의 (삭제되지 않은) 댓글을 raw 형식 list로 변환"""
+    return [to_raw_comment(c) for c in page.get("commentList", []) if not c.get("deleted")]
+
+def fetch_new_pages(session, webtoon_id, episode, first_page, mark, on_comments=None):
+    """최신 페이지부터 차례로 가져오다가 이미 수집한 댓글이 나오는 페이지에서 멈춘다."""
+    total_pages = first_page.get("pageModel", {}).get("totalPages", 1)
+    pages = [first_page]
+    page_num = 1
+    while True:
+        if on_comments is not None:
+            on_comments([c for c in page_comments(pages[-1]) if not is_seen(c, mark)])
+        comments = pages[-1].get("commentList", [])
+        if any(is_seen(to_raw_comment(c), mark, c.get("commentNo")) for c in comments if not c.get("deleted")):
+            break
+        page_num += 1
+        if page_num > total_pages:
+            break
+        pages.append(fetch_comment_page(session, webtoon_id, episode, page_num))
+    log(f"{len(pages)}페이지에서 이미 수집한 댓글에 도달하여 수집 종료")
+    return pages
+
+def scrape_webtoon_comments_api(title, episode, concurrency=COMMENT_API_CONCURRENCY, incremental=False, on_comments=None):
+    """
+    브라우저 없이 댓글 API를 직접 호출해 댓글을 수집한다.
+    첫 페이지로 전체 페이지 수를 확인한 뒤 나머지 페이지를 최대 concurrency개씩 동시에 가져오며,
+    결과는 scrape_webtoon_comments와 같은 형식으로 RAW_DATA_DIR에 저장된다.
+    incremental이면 마지막으로 수집한 댓글에 도달할 때까지만 페이지를 가져와 기존 파일에 병합한다.
+    on_comments가 주어지면 페이지를 받을 때마다 해당 페이지의 댓글 list를 넘겨 호출한다.
+    """
+    log(f"웹툰 '{title}'의 에피소드 {episode} 댓글 수집 시작 (API)")
+    webtoon_info = load_webtoon_info()
+
+    if title not in webtoon_info:
+        log(f"웹툰 '{title}' 정보를 찾을 수 없습니다.")
+        return
+
+    webtoon_id = webtoon_info[title]['id']
+    session = create_session(concurrency)
+
+    old_comments, mark = [], None
+    if incremental:
+        old_comments = load_existing_comments(title, episode)
+        mark = get_high_water_mark(title, episode) if old_comments else None
+        if mark is not None:
+            log(f"마지막으로 수집한 댓글 시각: {mark['date']}")
+
+    interest_count, like_count, rating = fetch_episode_info(session, webtoon_id, episode)
+    log(f"관심웹툰 등록자수: {interest_count}, 좋아요 수: {like_count}, 별점: {rating}")
+
+    first_page = fetch_comment_page(session, webtoon_id, episode, 1)
+    if mark is not None:
+        pages = fetch_new_pages(session, webtoon_id, episode, first_page, mark, on_comments)
+    else:
+        total_pages = first_page.get("pageModel", {}).get("totalPages", 1)
+        log(f"총 {total_pages}페이지의 댓글 로드 시작")
+
+        pages = [first_page]
+        if on_comments is not None:
+            on_comments(page_comments(first_page))
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for page in executor.map(
+                lambda page_num: fetch_comment_page(session, webtoon_id, episode, page_num),
+                range(2, total_pages + 1)
+            ):
+                pages.append(page)
+                if on_comments is not None:
+                    on_comments(page_comments(page))
+    session.close()
+
+    # 수집 도중 새 댓글이 달리면 페이지 경계가 밀리므로 commentNo 기준으로 중복 제거
+    comments_data = []
+    id_by_key = {}
+    seen = set()
+    for page in pages:
+        for comment in page.get("commentList", []):
+            comment_no = comment.get("commentNo")
+            if comment.get("deleted") or (comment_no is not None and comment_no in seen):
+                continue
+            seen.add(comment_no)
+            raw_comment = to_raw_comment(comment)
+            if mark is not None and is_seen(raw_comment, mark, comment_no):
+                continue
+            comments_data.append(raw_comment)
+            id_by_key[comment_key(raw_comment)] = comment_no
+    log("댓글 수집 완료")
+
+    if incremental:
+        log(f"새 댓글 {len(comments_data)}개를 기존 댓글 {len(old_comments)}개와 병합")
+        comments_data = merge_comments(comments_data, old_comments)
+
+    data = save_raw_comments(title, episode, interest_count, like_count, rating, comments_data)
+    save_high_water_mark(title, episode, comments_data, [id_by_key.get(comment_key(c)) for c in comments_data])
+    return data
+
+def main():
+    title = '김부장'
+    episode = 167
+    scrape_webtoon_comments_api(title, episode)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+from dotenv import load_dotenv
+from crawler.crawl_state import parse_comment_date
+from crawler.comment_store import to_count
+
+load_dotenv()
+
+# 전역 변수 설정
+# 설정하면 전처리 결과를 <PARQUET_DATA_DIR>/title=<제목>/<회차>.parquet에도 저장
+PARQUET_DATA_DIR = os.getenv('PARQUET_DATA_DIR')
+PARQUET_ROW_GROUP_SIZE = int(os.getenv('PARQUET_ROW_GROUP_SIZE', 50000))
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def parquet_enabled():
+    return bool(PARQUET_DATA_DIR)
+
+def get_parquet_path(title, episode):
+    return os.path.join(PARQUET_DATA_DIR, f"title={title}", f"{episode}.parquet")
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("episode", pa.int32()),
+        ("nickname", pa.string()),
+        ("text", pa.string()),
+        ("recomm", pa.int32()),
+        ("unrecomm", pa.int32()),
+        ("date", pa.timestamp("s", tz="Asia/Seoul")),
+        ("sentiment_score", pa.float32()),
+        ("reader_loyalty", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+class EpisodeParquetWriter:
+    """
+    한 회차의 전처리된 댓글을 타입이 지정된 Parquet 파일로 저장한다.
+    댓글을 PARQUET_ROW_GROUP_SIZE개씩 모아 row group 단위로 쓰므로 댓글을 한 개씩 넘겨도 메모리 사용량이 일정하다.
+    임시 파일(이름이 '.'으로 시작해 dataset 탐색에서 제외됨)에 쓴 뒤 close에서 교체한다.
+    """
+
+    def __init__(self, title, episode, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        import pyarrow.parquet as pq
+        self.title = title
+        self.episode = episode
+        self.row_group_size = row_group_size
+        self.path = get_parquet_path(title, episode)
+        self._tmp_path = os.path.join(os.path.dirname(self.path), f".{episode}.parquet.tmp")
+        self.schema = _schema()
+        self.count = 0
+        self._rows = []
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression="zstd")
+
+    def add(self, comment):
+        self._rows.append(comment)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        if not self._rows:
+            return
+        columns = {
+            "episode": [self.episode] * len(self._rows),
+            "nickname": [c["nickname"] for c in self._rows],
+            "text": [c["text"] for c in self._rows],
+            "recomm": [to_count(c.get("recomm")) or 0 for c in self._rows],
+            "unrecomm": [to_count(c.get("unrecomm")) or 0 for c in self._rows],
+            "date": [parse_comment_date(c["date"]) for c in self._rows],
+            "sentiment_score": [c["sentiment_score"] for c in self._rows],
+            "reader_loyalty": [c["reader_loyalty"] for c in self._rows],
+        }
+        self._writer.write_table(pa.table(columns, schema=self.schema))
+        self.count += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        log(f"{self.count}개의 댓글을 Parquet으로 저장: {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._writer.close()
+            os.remove(self._tmp_path)
+
+
+def write_episode_parquet(title, episode, comments):
+    """전처리된 댓글 list(또는 iterable)를 Parquet 파일로 저장"""
+    with EpisodeParquetWriter(title, episode) as writer:
+        for comment in comments:
+            writer.add(comment)
+    return writer.path
+
+def _restore_scores(df):
+    """
+    float32로 저장된 sentiment_score를 float64로 바꿔 소수점 둘째 자리로 반올림
+    (그대로 쓰면 -0.6이 -0.6000000238로 읽혀 JSON/DB 경로와 threshold 비교 결과가 달라짐)
+    """
+    if "sentiment_score" in df:
+        df["sentiment_score"] = df["sentiment_score"].astype("float64").round(2)
+    return df
+
+def load_episode_comments(title, episode, columns=None):
+    """한 회차의 댓글을 필요한 column만 memory-map으로 읽어 DataFrame으로 반환"""
+    import pyarrow.parquet as pq
+    return _restore_scores(pq.read_table(get_parquet_path(title, episode), columns=columns, memory_map=True).to_pandas())
+
+def load_title_comments(title, episodes=None, columns=None):
+    """
+    title의 여러 회차 댓글을 하나의 DataFrame으로 읽는다.
+    episodes가 주어지면 해당 회차만, columns가 주어지면 해당 column만 읽는다.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+    dataset = ds.dataset(os.path.abspath(os.path.join(PARQUET_DATA_DIR, f"title={title}")), format="parquet",
+                         schema=_schema(), filesystem=LocalFileSystem(use_mmap=True))
+    condition = ds.field("episode").isin(list(episodes)) if episodes is not None else None
+    return _restore_scores(dataset.to_table(columns=columns, filter=condition).to_pandas())
@@ -0,0 +1,127 @@
+import io
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 전역 변수 설정
+RAW_DATA_DIR = os.getenv('RAW_DATA_DIR')
+PROCESSED_DATA_DIR = os.getenv('PROCESSED_DATA_DIR')
+# 새로 저장할 댓글 파일 형식: json(기존 형식) | jsonl | jsonl.zst
+COMMENT_FILE_FORMAT = os.getenv('COMMENT_FILE_FORMAT', 'json')
+COMMENT_FILE_FORMATS = ("jsonl.zst", "jsonl", "json")
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def find_comment_file(directory, name):
+    """directory에 저장된 name의 댓글 파일 경로 (형식과 상관없이 찾으며, 없으면 None)"""
+    for file_format in COMMENT_FILE_FORMATS:
+        file_path = os.path.join(directory, f"{name}.{file_format}")
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+def comment_file_path(directory, name):
+    """이미 저장된 댓글 파일 경로, 없으면 COMMENT_FILE_FORMAT 형식으로 저장할 경로"""
+    return find_comment_file(directory, name) or os.path.join(directory, f"{name}.{COMMENT_FILE_FORMAT}")
+
+def raw_comment_path(title, episode):
+    return comment_file_path(RAW_DATA_DIR, f"{title}_{episode}")
+
+def processed_comment_path(title, episode):
+    return comment_file_path(PROCESSED_DATA_DIR, f"{title}_{episode}_processed")
+
+def to_count(value):
+    """'1,234' 같은 추천/비추천, 관심, 좋아요 수를 int로 변환 (이미 int이면 그대로, 비어 있으면 None)"""
+    if value is None or str(value).strip() == "":
+        return None
+    if isinstance(value, int):
+        return value
+    return int(str(value).replace(",", ""))
+
+def _open_text(file_path, mode, compressed=None):
+    """zstd 압축 파일(.zst)은 zstandard로 압축/해제하며 읽고 쓴다."""
+    if compressed is None:
+        compressed = file_path.endswith(".zst")
+    if compressed:
+        import zstandard
+        return io.TextIOWrapper(zstandard.open(file_path, mode.replace('t', 'b')), encoding='utf-8')
+    return open(file_path, mode, encoding='utf-8')
+
+def _remove_other_formats(directory, name, file_path):
+    """다른 형식으로 저장되어 있던 같은 이름의 댓글 파일 삭제"""
+    for file_format in COMMENT_FILE_FORMATS:
+        old_path = os.path.join(directory, f"{name}.{file_format}")
+        if old_path != file_path and os.path.exists(old_path):
+            os.remove(old_path)
+
+def read_header(file_path):
+    """댓글 파일의 회차 정보(comments를 제외한 필드)를 반환"""
+    if file_path.endswith(".json"):
+        return {key: value for key, value in load_comment_file(file_path).items() if key != "comments"}
+    with _open_text(file_path, 'rt') as f:
+        return json.loads(f.readline())
+
+def iter_comments(file_path):
+    """
+    댓글을 한 개씩 읽는다.
+    JSONL 파일은 한 줄씩 읽으므로 파일 크기와 상관없이 메모리 사용량이 일정하다 (기존 .json 파일은 전체를 읽음).
+    """
+    if file_path.endswith(".json"):
+        yield from load_comment_file(file_path).get("comments", [])
+        return
+    with _open_text(file_path, 'rt') as f:
+        f.readline()    # 회차 정보
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def load_comment_file(file_path):
+    """댓글 파일 전체를 기존 JSON 형식과 같은 dict로 읽는다."""
+    if file_path.endswith(".json"):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    data = read_header(file_path)
+    data["comments"] = list(iter_comments(file_path))
+    return data
+
+def write_comment_file(directory, name, header, comments):
+    """
+    회차 정보(header)와 댓글(comments, iterable)을 COMMENT_FILE_FORMAT 형식으로 저장하고 경로를 반환한다.
+    JSONL 형식은 첫 줄에 회차 정보, 이후 한 줄에 댓글 하나를 쓰며 comments를 한 개씩 소비한다.
+    임시 파일에 쓴 뒤 교체하므로 같은 파일의 iter_comments를 comments로 넘겨 다시 쓸 수 있다.
+    """
+    if COMMENT_FILE_FORMAT == "json":
+        data = dict(header)
+        data["comments"] = list(comments)
+        return save_comment_data(directory, name, data)
+
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"{name}.{COMMENT_FILE_FORMAT}")
+    count = 0
+    with _open_text(f"{file_path}.tmp", 'wt', compressed=file_path.endswith(".zst")) as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for comment in comments:
+            f.write(json.dumps(comment, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(f"{file_path}.tmp", file_path)
+    _remove_other_formats(directory, name, file_path)
+    log(f"{count}개의 댓글 저장: {file_path}")
+    return file_path
+
+def save_comment_data(directory, name, data):
+    """기존 JSON 형식의 dict(회차 정보 + comments)를 COMMENT_FILE_FORMAT 형식으로 저장하고 경로를 반환한다."""
+    if COMMENT_FILE_FORMAT != "json":
+        header = {key: value for key, value in data.items() if key != "comments"}
+        return write_comment_file(directory, name, header, data.get("comments", []))
+
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"{name}.json")
+    with open(f"{file_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(f"{file_path}.tmp", file_path)
+    _remove_other_formats(directory, name, file_path)
+    return file_path
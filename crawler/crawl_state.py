@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from dateutil.parser import parse
+from dotenv import load_dotenv
+from crawler.comment_store import find_comment_file, iter_comments
+
+load_dotenv()
+
+# 전역 변수 설정
+RAW_DATA_DIR = os.getenv('RAW_DATA_DIR')
+CRAWL_STATE_FILE = os.getenv('CRAWL_STATE_FILE')
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 같은 process의 수집 thread(batch)끼리 crawl_state.json 갱신이 겹치지 않도록 사용
+_state_lock = threading.Lock()
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def get_state_path():
+    return CRAWL_STATE_FILE or os.path.join(RAW_DATA_DIR, "crawl_state.json")
+
+@contextmanager
+def locked_state_file():
+    """
+    crawl_state.json을 읽고 다시 쓰는 동안 다른 thread와 process가 갱신하지 못하게 잠근다.
+    (process 사이에는 <state 파일>.lock에 fcntl lock을 걸며, fcntl이 없으면 thread lock만 사용)
+    """
+    state_path = get_state_path()
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    with _state_lock:
+        if fcntl is None:
+            yield state_path
+            return
+        with open(f"{state_path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield state_path
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def load_crawl_state():
+    state_path = get_state_path()
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def parse_comment_date(date):
+    """댓글 date(예: 2025-02-03T23:00:05+0900)를 datetime으로 변환"""
+    try:
+        return datetime.strptime(date, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return parse(date)
+
+def comment_key(comment):
+    """댓글 id가 없을 때 댓글을 구분하는 키"""
+    return f"{comment['date']}|{comment['nickname']}|{comment['text']}"
+
+def get_high_water_mark(title, episode):
+    """
+    (title, episode)에서 지금까지 수집한 가장 최신 댓글의 기록을 반환한다.
+    {"date": 최신 댓글 date, "keys": 해당 시각 댓글들의 키, "ids": 해당 시각 댓글들의 id}
+    """
+    return load_crawl_state().get(f"{title}_{episode}")
+
+def save_high_water_mark(title, episode, comments, ids=None):
+    """
+    최신순으로 정렬된 comments에서 가장 최신 댓글 시각을 high-water mark로 저장한다.
+    같은 시각에 달린 댓글이 여러 개일 수 있으므로 해당 시각 댓글들의 키(와 id)를 함께 저장한다.
+    """
+    if not comments:
+        return
+    newest = parse_comment_date(comments[0]["date"])
+    newest_index = [i for i, comment in enumerate(comments) if parse_comment_date(comment["date"]) == newest]
+
+    mark = {
+        "date": comments[0]["date"],
+        "keys": [comment_key(comments[i]) for i in newest_index],
+        "ids": [str(ids[i]) for i in newest_index if ids is not None and ids[i] is not None]
+    }
+    # 여러 수집 작업이 동시에 저장해도 서로의 기록을 지우지 않도록 잠근 상태에서 읽고 고친 뒤,
+    # 읽는 쪽에 반쯤 쓴 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체
+    with locked_state_file() as state_path:
+        state = load_crawl_state()
+        state[f"{title}_{episode}"] = mark
+        tmp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, state_path)
+
+def is_seen(comment, mark, comment_id=None):
+    """comment가 high-water mark 시점 또는 그 이전에 이미 수집된 댓글인지 확인"""
+    date = parse_comment_date(comment["date"])
+    mark_date = parse_comment_date(mark["date"])
+    if date != mark_date:
+        return date < mark_date
+    if comment_id is not None and mark.get("ids"):
+        return str(comment_id) in mark["ids"]
+    return comment_key(comment) in mark["keys"]
+
+def merge_comments(new_comments, old_comments):
+    """새 댓글을 기존 댓글 앞에 붙이고(최신순 유지) 중복 댓글은 제거"""
+    merged = []
+    seen = set()
+    for comment in new_comments + old_comments:
+        key = comment_key(comment)
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(comment)
+    return merged
+
+def load_existing_comments(title, episode):
+    """RAW_DATA_DIR에 저장된 기존 댓글 목록 (없으면 빈 list)"""
+    file_path = find_comment_file(RAW_DATA_DIR, f"{title}_{episode}")
+    if file_path is None:
+        return []
+    return list(iter_comments(file_path))
@@ -0,0 +1,49 @@
+import os
+from crawler.comment_store import raw_comment_path, processed_comment_path, load_comment_file
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+
+class EpisodeContext:
+    """
+    한 회차를 처리하는 동안 stage 사이에서 댓글과 회차 정보를 메모리로 전달한다.
+    앞 stage가 채운 데이터를 뒤 stage가 그대로 사용하므로 같은 파일을 다시 읽거나 DB에서 다시 가져오지 않는다.
+    앞 stage를 건너뛰어 데이터가 비어 있으면 처음 사용할 때 해당 파일을 한 번만 읽는다.
+
+    - raw: 수집 결과 (RAW_DATA_DIR/<제목>_<회차>.json과 같은 형식의 dict)
+    - processed: 감성 점수, 독자 유형, trend가 추가된 결과 (PROCESSED_DATA_DIR/<제목>_<회차>_processed.json과 같은 형식의 dict)
+    - created_at: DB에 처음 적재된 시각 (load stage가 채움)
+    """
+
+    def __init__(self, title, episode):
+        self.title = title
+        self.episode = episode
+        self._raw = None
+        self._processed = None
+        self.created_at = None
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = load_comment_file(raw_comment_path(self.title, self.episode))
+        return self._raw
+
+    @raw.setter
+    def raw(self, data):
+        self._raw = data
+
+    @property
+    def processed(self):
+        if self._processed is None:
+            file_path = processed_comment_path(self.title, self.episode)
+            if os.path.exists(file_path):
+                self._processed = load_comment_file(file_path)
+            else:
+                log(f"파일 없음: {file_path}")
+        return self._processed
+
+    @processed.setter
+    def processed(self, data):
+        self._processed = data
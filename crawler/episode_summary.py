@@ -0,0 +1,114 @@
+import json
+import os
+from dotenv import load_dotenv
+from crawler.comment_store import find_comment_file, read_header, iter_comments, to_count
+
+load_dotenv()
+
+# 전역 변수 설정
+PROCESSED_DATA_DIR = os.getenv('PROCESSED_DATA_DIR')
+# 회차별 요약 파일(<제목>_<회차>_summary.json)을 저장할 폴더 (기본값: processed 폴더)
+SUMMARY_DATA_DIR = os.getenv('SUMMARY_DATA_DIR') or PROCESSED_DATA_DIR
+
+# 감성 점수 구간 (trend의 부정 댓글 비율은 sentiment_score <= NEGATIVE_THRESHOLD인 댓글 수로 계산)
+NEGATIVE_THRESHOLD = -0.5
+POSITIVE_THRESHOLD = 0.5
+SENTIMENT_BUCKETS = ("positive", "neutral", "negative")
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def summary_path(title, episode):
+    return os.path.join(SUMMARY_DATA_DIR, f"{title}_{episode}_summary.json")
+
+def sentiment_bucket(score):
+    if score <= NEGATIVE_THRESHOLD:
+        return "negative"
+    if score >= POSITIVE_THRESHOLD:
+        return "positive"
+    return "neutral"
+
+
+class EpisodeSummaryBuilder:
+    """
+    댓글을 한 개씩 받아 독자 유형별, 감성 구간별 댓글 수를 센다.
+    댓글 목록 전체를 들고 있지 않으므로 stream 변환 중에도 사용할 수 있다.
+    """
+
+    def __init__(self, title, episode):
+        self.title = title
+        self.episode = episode
+        self.total_comments = 0
+        self.sentiment_counts = {}
+
+    def add(self, comment):
+        counts = self.sentiment_counts.setdefault(
+            comment["reader_loyalty"], {bucket: 0 for bucket in SENTIMENT_BUCKETS}
+        )
+        counts[sentiment_bucket(comment.get("sentiment_score", 0))] += 1
+        self.total_comments += 1
+
+    def build(self, header):
+        """
+        header(관심 수, 좋아요 수, 별점이 있는 processed 데이터의 댓글 외 필드)와 센 결과로 요약 record 생성
+        별점은 수집 당시 header의 값이며, trend는 에피소드 목록 파일의 현재 별점을 사용한다.
+        """
+        return {
+            "webtoon": self.title,
+            "episode": int(self.episode),
+            "rating": header.get("rating"),
+            "interest_count": to_count(header.get("interest_count")) or 0,
+            "like_count": to_count(header.get("like_count")) or 0,
+            "total_comments": self.total_comments,
+            "sentiment_counts": self.sentiment_counts,
+        }
+
+    def save(self, header):
+        return save_summary(self.build(header))
+
+
+def save_summary(summary):
+    """요약 record를 임시 파일에 쓴 뒤 교체"""
+    os.makedirs(SUMMARY_DATA_DIR, exist_ok=True)
+    file_path = summary_path(summary["webtoon"], summary["episode"])
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, file_path)
+    log(f"요약 저장: {file_path}")
+    return file_path
+
+def write_episode_summary(title, episode, data):
+    """processed 데이터(dict)의 요약 record를 저장"""
+    builder = EpisodeSummaryBuilder(title, episode)
+    for comment in data.get("comments", []):
+        builder.add(comment)
+    return builder.save(data)
+
+def load_summary(title, episode):
+    file_path = summary_path(title, episode)
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def backfill_summary(title, episode):
+    """요약 파일이 없는 회차는 processed 파일로 한 번 만들어 저장 (processed 파일도 없으면 None)"""
+    processed_file = find_comment_file(PROCESSED_DATA_DIR, f"{title}_{episode}_processed")
+    if processed_file is None:
+        return None
+    builder = EpisodeSummaryBuilder(title, episode)
+    for comment in iter_comments(processed_file):
+        builder.add(comment)
+    summary = builder.build(read_header(processed_file))
+    save_summary(summary)
+    return summary
+
+def negative_comment_ratio(summary):
+    """부정 댓글 비율 (%, 소수점 둘째 자리까지, 댓글이 없으면 0)"""
+    total_comments = summary["total_comments"]
+    if total_comments == 0:
+        return 0
+    negative_comments = sum(counts["negative"] for counts in summary["sentiment_counts"].values())
+    return round(negative_comments / total_comments * 100, 2)
@@ -2,12 +2,12 @@ import json
 import os
 import time
 import re
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
+from crawler.webdriver_pool import get_default_pool, record_page
+from crawler.comment_store import save_comment_data
+from crawler.crawl_state import get_high_water_mark, save_high_water_mark, is_seen, merge_comments, load_existing_comments
 
 load_dotenv()
 
@@ -16,6 +16,77 @@ WEBTOON_INFO_FILE = os.getenv('WEBTOON_INFO_FILE')
 EPISODE_DATA_DIR = os.getenv('EPISODE_DATA_DIR')
 RAW_DATA_DIR = os.getenv('RAW_DATA_DIR')
 HEADERS = {'User-agent': 'Mozilla/5.0'}
+COMMENT_FIELDS = ("nickname", "text", "recomm", "unrecomm", "date")
+
+# 한 번의 execute_script 호출로 모든 댓글 필드를 가져오는 스크립트
+# 필드 중 하나라도 없는 댓글은 null을 담아 반환하고, Python 쪽에서 건너뛴다.
+EXTRACT_COMMENTS_SCRIPT = """
+const field = (root, cls) => {
+    const el = root.querySelector('.' + cls);
+    return el === null ? null : el.innerText.trim();
+};
+const boxes = document.querySelectorAll('.u_cbox_comment_box');
+return {
+    count: boxes.length,
+    comments: Array.from(boxes).map(box => {
+        const date = box.querySelector('.u_cbox_date');
+        return {
+            nickname: field(box, 'u_cbox_nick'),
+            text: field(box, 'u_cbox_contents'),
+            recomm: field(box, 'u_cbox_cnt_recomm'),
+            unrecomm: field(box, 'u_cbox_cnt_unrecomm'),
+            date: date === null ? null : date.getAttribute('data-value')
+        };
+    })
+};
+"""
+
+# 지금 DOM에 남아 있는 댓글을 추출한 뒤 해당 노드를 DOM에서 제거하는 스크립트 (streaming 수집용)
+# 추출 결과가 페이지 구조와 맞지 않으면 노드를 제거하지 않고 detached: false를 반환한다.
+HARVEST_AND_DETACH_SCRIPT = """
+const field = (root, cls) => {
+    const el = root.querySelector('.' + cls);
+    return el === null ? null : el.innerText.trim();
+};
+const boxes = Array.from(document.querySelectorAll('.u_cbox_comment_box'));
+const comments = boxes.map(box => {
+    const date = box.querySelector('.u_cbox_date');
+    return {
+        nickname: field(box, 'u_cbox_nick'),
+        text: field(box, 'u_cbox_contents'),
+        recomm: field(box, 'u_cbox_cnt_recomm'),
+        unrecomm: field(box, 'u_cbox_cnt_unrecomm'),
+        date: date === null ? null : date.getAttribute('data-value')
+    };
+});
+const valid = comments.filter(c => Object.values(c).every(v => v !== null));
+if (boxes.length > 0 && valid.length === 0) {
+    return {count: boxes.length, comments: [], detached: false};
+}
+boxes.forEach(box => (box.closest('li') || box).remove());
+return {count: boxes.length, comments: valid, detached: true};
+"""
+
+# 한 번의 execute_script 호출로 에피소드 목록을 가져오는 스크립트
+EXTRACT_EPISODES_SCRIPT = """
+const field = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el === null ? null : el.innerText.trim();
+};
+const items = document.querySelectorAll('.EpisodeListList__item--M8zq4');
+return {
+    count: items.length,
+    episodes: Array.from(items).map(item => {
+        const link = item.querySelector('.EpisodeListList__link--DdClU');
+        return {
+            title: field(item, '.EpisodeListList__title--lfIzU'),
+            href: link === null ? null : link.getAttribute('href'),
+            rating: field(item, '.Rating__star_area--dFzsb .text'),
+            date: field(item, '.EpisodeListList__meta_info--Cgquz .date')
+        };
+    })
+};
+"""
 
 def log(message):
     print(f"[LOG] {message}")
@@ -25,32 +96,8 @@ def load_webtoon_info(file_path=WEBTOON_INFO_FILE):
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
     
-def init_webdriver():
-    """Selenium 웹드라이버 초기화 및 설정"""
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')  # 브라우저를 띄우지 않고 실행
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    
-def scrape_recent_episodes(title):
-    log(f"웹툰 '{title}'의 최근 회차 정보 수집 시작")
-    webtoon_info = load_webtoon_info()
-    
-    if title not in webtoon_info:
-        print(f"웹툰 '{title}' 정보를 찾을 수 없습니다.")
-        return
-    
-    webtoon_id = webtoon_info[title]['id']
-    url = f"https://comic.naver.com/webtoon/list?titleId={webtoon_id}"
-    log(f"웹툰 URL 접근 중: {url}")
-    
-    driver = init_webdriver()
-    driver.get(url)
-    log("페이지 로드 완료")
-    time.sleep(3)
-    
-    # 최근 에피소드 목록 가져오기
+def _harvest_episodes_by_element(driver):
+    """에피소드마다 find_element로 필드를 하나씩 가져오는 방식 (bulk 추출 실패 시 사용)"""
     episode_elements = driver.find_elements(By.CLASS_NAME, 'EpisodeListList__item--M8zq4')
     
     episodes_data = []
@@ -69,66 +116,37 @@ def scrape_recent_episodes(title):
             })
         except NoSuchElementException:
             continue
+    return episodes_data
 
-    log(f"총 {len(episodes_data)}개의 에피소드 정보 수집 완료")
-    driver.quit()
+def harvest_episodes(driver):
+    """
+    에피소드 목록을 한 번의 execute_script 호출로 가져온다.
+    결과가 예상한 형태가 아니면 find_element 방식으로 다시 수집한다.
+    """
+    result = driver.execute_script(EXTRACT_EPISODES_SCRIPT)
+    if not isinstance(result, dict) or not isinstance(result.get("episodes"), list):
+        log("에피소드 bulk 추출 실패, 개별 추출로 전환")
+        return _harvest_episodes_by_element(driver)
 
-    # JSON 파일로 저장
-    os.makedirs(EPISODE_DATA_DIR, exist_ok=True)
-    save_path = os.path.join(EPISODE_DATA_DIR, f"{title}.json")
-    with open(save_path, 'w', encoding='utf-8') as f:
-        json.dump({"webtoon": title, "episodes": episodes_data}, f, ensure_ascii=False, indent=4)
-    
-    log(f"{title}의 에피소드 정보가 {save_path}에 저장되었습니다.")
+    episodes_data = []
+    for episode in result["episodes"]:
+        match = re.search(r"no=(\d+)", episode.get("href") or "")
+        if None in (episode.get("title"), episode.get("rating"), episode.get("date")) or match is None:
+            continue
+        episodes_data.append({
+            "title": episode["title"],
+            "episode": match.group(1),
+            "rating": episode["rating"],
+            "date": episode["date"]
+        })
 
-def scrape_webtoon_comments(title, episode):
-    log(f"웹툰 '{title}'의 에피소드 {episode} 댓글 수집 시작")
-    webtoon_info = load_webtoon_info()
+    if result["count"] > 0 and not episodes_data:
+        log("에피소드 bulk 추출 결과가 비어 있음, 개별 추출로 전환")
+        return _harvest_episodes_by_element(driver)
+    return episodes_data
 
-    if title not in webtoon_info:
-        log(f"웹툰 '{title}' 정보를 찾을 수 없습니다.")
-        return
-    
-    webtoon_id = webtoon_info[title]['id']
-    url = f"https://comic.naver.com/webtoon/detail?titleId={webtoon_id}&no={episode}"
-    log(f"웹툰 URL 접근 중: {url}")
-    
-    driver = init_webdriver()
-    driver.get(url)
-    log("페이지 로드 완료")
-    time.sleep(3)
-    
-    # 관심웹툰 등록자수
-    interest_count = driver.find_element(By.CLASS_NAME, 'UserAction__count--jk3vo').text
-    log(f"관심웹툰 등록자수 수집 완료: {interest_count}")
-    
-    # 좋아요 수
-    like_count = driver.find_element(By.CLASS_NAME, 'u_cnt._count').text
-    log(f"좋아요 수 수집 완료: {like_count}")
-    
-    # 별점
-    rating = driver.find_element(By.CLASS_NAME, 'UserAction__score--sP1ha').text
-    log(f"별점 수집 완료: {rating}")
-    
-    # 전체 댓글 보기 버튼 클릭
-    try:
-        view_comments_btn = driver.find_element(By.CLASS_NAME, 'u_cbox_btn_view_comment')
-        view_comments_btn.click()
-        log("전체 댓글 보기 버튼 클릭")
-        time.sleep(2)
-    except:
-        log("전체 댓글 보기 버튼이 없습니다.")
-    
-    # 더보기 버튼 클릭 (끝까지)
-    log("댓글 로드 시작")
-    while True:
-        try:
-            more_btn = driver.find_element(By.CLASS_NAME, 'u_cbox_paginate')
-            more_btn.click()
-            time.sleep(1)
-        except:
-            break
-    
+def _harvest_comments_by_element(driver):
+    """댓글마다 find_element로 필드를 하나씩 가져오는 방식 (bulk 추출 실패 시 사용)"""
     comments_data = []
     comments = driver.find_elements(By.CLASS_NAME, 'u_cbox_comment_box')
     log(f"총 {len(comments)}개의 댓글을 수집 중")
@@ -148,24 +166,267 @@ def scrape_webtoon_comments(title, episode):
             })
         except NoSuchElementException:
             continue
-    log("댓글 수집 완료")
-    
-    driver.quit()
-    
-    # JSON 파일로 저장
+    return comments_data
+
+def harvest_comments(driver):
+    """
+    페이지에 로드된 모든 댓글을 한 번의 execute_script 호출로 가져온다.
+    결과가 예상한 형태가 아니면 find_element 방식으로 다시 수집한다.
+    """
+    result = driver.execute_script(EXTRACT_COMMENTS_SCRIPT)
+    if not isinstance(result, dict) or not isinstance(result.get("comments"), list):
+        log("댓글 bulk 추출 실패, 개별 추출로 전환")
+        return _harvest_comments_by_element(driver)
+
+    log(f"총 {result['count']}개의 댓글을 수집 중")
+    comments_data = [
+        {key: comment[key] for key in COMMENT_FIELDS}
+        for comment in result["comments"]
+        if isinstance(comment, dict) and None not in (comment.get(key) for key in COMMENT_FIELDS)
+    ]
+
+    if result["count"] > 0 and not comments_data:
+        log("댓글 bulk 추출 결과가 비어 있음, 개별 추출로 전환")
+        return _harvest_comments_by_element(driver)
+    return comments_data
+
+def harvest_and_detach_comments(driver):
+    """
+    새로 로드된 댓글을 추출하고 DOM에서 제거한다.
+    페이지 구조가 예상과 다르면 아무것도 제거하지 않고 None을 반환한다.
+    """
+    result = driver.execute_script(HARVEST_AND_DETACH_SCRIPT)
+    if not isinstance(result, dict) or not result.get("detached") or not isinstance(result.get("comments"), list):
+        return None
+    return [{key: comment[key] for key in COMMENT_FIELDS} for comment in result["comments"]]
+
+def click_more_button(driver):
+    """댓글 더보기 버튼을 클릭하고, 버튼이 없으면 False 반환"""
+    try:
+        more_btn = driver.find_element(By.CLASS_NAME, 'u_cbox_paginate')
+        more_btn.click()
+        record_page(driver)
+        time.sleep(1)
+        return True
+    except:
+        return False
+
+def get_spool_path(title, episode):
+    return os.path.join(RAW_DATA_DIR, f"{title}_{episode}.spool.jsonl")
+
+def read_spool(spool_path):
+    """
+    spool 파일을 읽어 (회차 정보, 댓글 목록)을 반환한다.
+    수집 도중 중단되어 마지막 줄이 깨져 있으면 해당 줄은 무시한다.
+    """
+    header, comments_data = None, []
+    with open(spool_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if header is None:
+                header = record
+            else:
+                comments_data.append(record)
+    return header, comments_data
+
+def recover_spool(title, episode):
+    """
+    중단된 streaming 수집의 spool 파일에서 지금까지 수집한 댓글을 기존 raw 파일에 병합해 저장
+    (incremental 수집의 spool에는 새 댓글만 있으므로 기존 raw 파일을 덮어쓰지 않는다.)
+    """
+    header, comments_data = read_spool(get_spool_path(title, episode))
+    if header is None:
+        log("복구할 댓글이 없습니다.")
+        return
+    comments_data = merge_comments(comments_data, load_existing_comments(title, episode))
+    save_raw_comments(title, episode, header["interest_count"], header["like_count"], header["rating"], comments_data)
+
+def stream_harvest_comments(driver, title, episode, interest_count, like_count, rating, mark=None, on_comments=None):
+    """
+    더보기 버튼으로 페이지를 로드할 때마다 새 댓글만 추출해 spool 파일(JSONL)에 추가하고,
+    추출한 노드는 DOM에서 제거하여 브라우저 메모리를 일정하게 유지한다.
+    수집이 중간에 중단되어도 spool 파일에 그때까지의 댓글이 남는다.
+    high-water mark(mark)가 주어지면 이미 수집한 댓글에 도달한 페이지에서 수집을 멈춘다.
+    on_comments가 주어지면 페이지마다 새로 수집한 댓글 list를 넘겨 호출한다.
+    """
+    spool_path = get_spool_path(title, episode)
+    if os.path.exists(spool_path):
+        log(f"중단된 수집 기록 발견, 복구 후 다시 수집: {spool_path}")
+        recover_spool(title, episode)
+
     os.makedirs(RAW_DATA_DIR, exist_ok=True)
-    save_path = os.path.join(RAW_DATA_DIR, f"{title}_{episode}.json")
-    with open(save_path, 'w', encoding='utf-8') as f:
-        json.dump({
+    with open(spool_path, 'w', encoding='utf-8') as spool:
+        spool.write(json.dumps({
             "webtoon": title,
             "episode": episode,
             "interest_count": interest_count,
             "like_count": like_count,
-            "rating": rating,
-            "comments": comments_data
-        }, f, ensure_ascii=False, indent=4)
+            "rating": rating
+        }, ensure_ascii=False) + "\n")
+
+        harvested = 0
+        while True:
+            new_comments = harvest_and_detach_comments(driver)
+            if new_comments is None:
+                log("streaming 추출 실패, 남은 댓글을 모두 로드한 뒤 한 번에 수집")
+                while click_more_button(driver):
+                    pass
+                new_comments = harvest_comments(driver)
+
+            reached_seen = False
+            if mark is not None:
+                unseen_comments = [comment for comment in new_comments if not is_seen(comment, mark)]
+                reached_seen = len(unseen_comments) < len(new_comments)
+                new_comments = unseen_comments
+
+            for comment in new_comments:
+                spool.write(json.dumps(comment, ensure_ascii=False) + "\n")
+            spool.flush()
+            if on_comments is not None and new_comments:
+                on_comments(new_comments)
+            harvested += len(new_comments)
+            log(f"{harvested}개의 댓글 수집")
+
+            if reached_seen:
+                log("이미 수집한 댓글에 도달하여 수집 종료")
+                break
+            if not click_more_button(driver):
+                break
+
+    _, comments_data = read_spool(spool_path)
+    return comments_data
+
+def scrape_recent_episodes(title):
+    log(f"웹툰 '{title}'의 최근 회차 정보 수집 시작")
+    webtoon_info = load_webtoon_info()
+    
+    if title not in webtoon_info:
+        print(f"웹툰 '{title}' 정보를 찾을 수 없습니다.")
+        return
+    
+    webtoon_id = webtoon_info[title]['id']
+    url = f"https://comic.naver.com/webtoon/list?titleId={webtoon_id}"
+    log(f"웹툰 URL 접근 중: {url}")
+    
+    with get_default_pool().session() as driver:
+        driver.get(url)
+        record_page(driver)
+        log("페이지 로드 완료")
+        time.sleep(3)
+    
+        # 최근 에피소드 목록 가져오기
+        episodes_data = harvest_episodes(driver)
+
+        log(f"총 {len(episodes_data)}개의 에피소드 정보 수집 완료")
+
+    # JSON 파일로 저장 (다른 작업이 읽는 중에도 잘린 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체)
+    # 내용이 같으면 다시 쓰지 않아 회차 목록을 입력으로 쓰는 전처리 stage가 다시 실행되지 않게 한다.
+    os.makedirs(EPISODE_DATA_DIR, exist_ok=True)
+    save_path = os.path.join(EPISODE_DATA_DIR, f"{title}.json")
+    episode_list = {"webtoon": title, "episodes": episodes_data}
+    if os.path.exists(save_path):
+        with open(save_path, 'r', encoding='utf-8') as f:
+            try:
+                unchanged = json.load(f) == episode_list
+            except json.JSONDecodeError:
+                unchanged = False
+        if unchanged:
+            log(f"{title}의 에피소드 정보 변경 없음: {save_path}")
+            return
+    tmp_path = f"{save_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(episode_list, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, save_path)
+    
+    log(f"{title}의 에피소드 정보가 {save_path}에 저장되었습니다.")
+
+def scrape_webtoon_comments(title, episode, stream=False, incremental=False, on_comments=None):
+    log(f"웹툰 '{title}'의 에피소드 {episode} 댓글 수집 시작")
+    webtoon_info = load_webtoon_info()
+
+    if title not in webtoon_info:
+        log(f"웹툰 '{title}' 정보를 찾을 수 없습니다.")
+        return
+    
+    webtoon_id = webtoon_info[title]['id']
+    url = f"https://comic.naver.com/webtoon/detail?titleId={webtoon_id}&no={episode}"
+    log(f"웹툰 URL 접근 중: {url}")
+    
+    with get_default_pool().session() as driver:
+        driver.get(url)
+        record_page(driver)
+        log("페이지 로드 완료")
+        time.sleep(3)
+    
+        # 관심웹툰 등록자수
+        interest_count = driver.find_element(By.CLASS_NAME, 'UserAction__count--jk3vo').text
+        log(f"관심웹툰 등록자수 수집 완료: {interest_count}")
+    
+        # 좋아요 수
+        like_count = driver.find_element(By.CLASS_NAME, 'u_cnt._count').text
+        log(f"좋아요 수 수집 완료: {like_count}")
+    
+        # 별점
+        rating = driver.find_element(By.CLASS_NAME, 'UserAction__score--sP1ha').text
+        log(f"별점 수집 완료: {rating}")
+    
+        # 전체 댓글 보기 버튼 클릭
+        try:
+            view_comments_btn = driver.find_element(By.CLASS_NAME, 'u_cbox_btn_view_comment')
+            view_comments_btn.click()
+            log("전체 댓글 보기 버튼 클릭")
+            time.sleep(2)
+        except:
+            log("전체 댓글 보기 버튼이 없습니다.")
+    
+        # 증분 수집: 기존 raw 파일과 마지막 수집 기록이 있으면 새 댓글만 수집
+        old_comments, mark = [], None
+        if incremental:
+            old_comments = load_existing_comments(title, episode)
+            mark = get_high_water_mark(title, episode) if old_comments else None
+            if mark is not None:
+                log(f"마지막으로 수집한 댓글 시각: {mark['date']}")
+
+        # 더보기 버튼 클릭 (끝까지)
+        log("댓글 로드 시작")
+        stream = stream or mark is not None or on_comments is not None
+        if stream:
+            comments_data = stream_harvest_comments(driver, title, episode, interest_count, like_count, rating, mark,
+                                                    on_comments)
+        else:
+            while click_more_button(driver):
+                pass
+            comments_data = harvest_comments(driver)
+        log("댓글 수집 완료")
+    
+    if incremental:
+        log(f"새 댓글 {len(comments_data)}개를 기존 댓글 {len(old_comments)}개와 병합")
+        comments_data = merge_comments(comments_data, old_comments)
+
+    # JSON 파일로 저장
+    data = save_raw_comments(title, episode, interest_count, like_count, rating, comments_data)
+    save_high_water_mark(title, episode, comments_data)
+    if stream:
+        os.remove(get_spool_path(title, episode))
+    return data
+
+def save_raw_comments(title, episode, interest_count, like_count, rating, comments_data):
+    """수집한 회차 정보와 댓글을 RAW_DATA_DIR에 댓글 파일(COMMENT_FILE_FORMAT)로 저장하고, 저장한 데이터를 반환"""
+    data = {
+        "webtoon": title,
+        "episode": episode,
+        "interest_count": interest_count,
+        "like_count": like_count,
+        "rating": rating,
+        "comments": comments_data
+    }
+    save_path = save_comment_data(RAW_DATA_DIR, f"{title}_{episode}", data)
     
     log(f"{len(comments_data)}개의 댓글이 {save_path}에 저장되었습니다.")
+    return data
 
 def main():
     title = '김부장'
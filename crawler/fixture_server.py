@@ -0,0 +1,65 @@
+import os
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# 녹화해둔 API 응답 파일을 제공하는 로컬 stand-in server
+#
+# fixture 디렉토리 구조 예시:
+#   fixtures/comments_1.json, comments_2.json, ...  -> /comments?page=N
+#   fixtures/article_info.json                       -> /article_info
+#   fixtures/user_action.json                        -> /user_action
+#   fixtures/like.json                               -> /like
+#
+# comment_api.py를 이 server로 향하게 하려면 다음 환경 변수를 설정한다.
+#   COMMENT_API_URL=http://127.0.0.1:8000/comments
+#   ARTICLE_INFO_API_URL=http://127.0.0.1:8000/article_info
+#   USER_ACTION_API_URL=http://127.0.0.1:8000/user_action
+#   LIKE_API_URL=http://127.0.0.1:8000/like
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def make_handler(fixture_dir):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            name = url.path.strip('/').replace('/', '_')
+            page = parse_qs(url.query).get('page')
+            candidates = [f"{name}_{page[0]}.json"] if page else []
+            candidates.append(f"{name}.json")
+
+            for candidate in candidates:
+                file_path = os.path.join(fixture_dir, candidate)
+                if os.path.isfile(file_path):
+                    with open(file_path, 'rb') as f:
+                        body = f.read()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+            self.send_error(404, f"fixture not found: {candidates}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="댓글 API fixture stand-in server")
+    parser.add_argument('--fixtures', required=True, help='녹화된 API 응답 JSON 파일 디렉토리')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.fixtures))
+    log(f"fixture server 실행 중: http://127.0.0.1:{args.port} ({args.fixtures})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
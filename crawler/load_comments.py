@@ -1,106 +1,129 @@
 import json
 import os
-import psycopg2
 from dotenv import load_dotenv
+from crawler.comment_store import find_comment_file, read_header, iter_comments, to_count
+from db import get_connection
 
 load_dotenv()
 
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-
 PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")  # 댓글 JSON 데이터가 있는 폴더
 
 def log(message):
     """로그 출력 함수"""
     print(f"[LOG] {message}")
 
-def load_json(filepath):
-    """ JSON 파일 로드 함수 """
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        log(f"파일 없음: {filepath}")
-        return None  # 파일이 없으면 None 반환
-    
-
-def connect_db():
-    """ PostgreSQL 연결 및 테이블 생성 """
-    conn = psycopg2.connect(
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT
-    )
-    cursor = conn.cursor()
-
-    # ✅ 테이블이 없으면 자동 생성
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS webtoon_episodes (
-        id SERIAL PRIMARY KEY,
-        webtoon VARCHAR(255) NOT NULL,
-        episode INT NOT NULL,
-        interest_count INT,
-        like_count INT,
-        rating FLOAT,
-        trend JSONB,  -- 최근 5화의 별점 & 부정 댓글 비율 저장
-        comments JSONB, -- 댓글 전체를 JSON 형태로 저장
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE (webtoon, episode)  -- 중복 방지
-    );
-    """
-    cursor.execute(create_table_query)
-    conn.commit()
-    cursor.close()
 
-    return conn
+COMMENT_COPY_COLUMNS = ("episode_id", "comment_index", "webtoon", "episode", "nickname", "text", "recomm", "unrecomm",
+                        "date", "sentiment_score", "reader_loyalty")
 
-def insert_episode_data(webtoon_name, episode):
-    """웹툰 회차 데이터를 DB에 적재"""
-    conn = connect_db()
-    cursor = conn.cursor()
+def get_episode_values(processed_data):
+    """processed 데이터에서 DB에 저장되는 형태의 (관심 수, 좋아요 수, 별점, trend, 댓글 목록)을 추출"""
+    # 기본 필드 추출 (전처리에서 int로 변환된 값과 이전의 '1,234' 형식 문자열 모두 처리)
+    interest_count = to_count(processed_data.get("interest_count")) or 0
+    like_count = to_count(processed_data.get("like_count")) or 0
+    rating = float(processed_data.get("rating", "0"))
+    comments = processed_data.get("comments", [])
 
-    # 파일 경로 정의
-    processed_file = os.path.join(PROCESSED_DATA_DIR, f"{webtoon_name}_{episode}_processed.json")
+    # trend 필드 추출
+    trend = processed_data.get("trend", {})
+    return interest_count, like_count, rating, trend, comments
 
-    # JSON 데이터 로드
-    processed_data = load_json(processed_file)
 
-    if processed_data is None:
-        log(f"데이터 없음: {webtoon_name} {episode}")
-        return
+def to_copy_value(value):
+    """COPY text 형식의 값으로 변환 (None은 NULL, 구분 문자는 escape)"""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
 
-    # 기본 필드 추출
-    interest_count = int(processed_data.get("interest_count", "0").replace(",", ""))
-    like_count = int(processed_data.get("like_count", "0").replace(",", ""))
-    rating = float(processed_data.get("rating", "0"))
-    comments = json.dumps(processed_data.get("comments", []), ensure_ascii=False)
 
-    # trend 필드 추출
-    trend = processed_data.get("trend", {})
+class CommentCopyStream:
+    """
+    COPY ... FROM STDIN에 넘기는 file 객체.
+    psycopg2가 read를 호출할 때마다 필요한 만큼의 댓글만 COPY 행으로 변환하므로 댓글 전체를 문자열로 만들지 않는다.
+    """
+
+    def __init__(self, episode_id, webtoon_name, episode, comments):
+        self._rows = (
+            (episode_id, index, webtoon_name, episode, c.get("nickname"), c.get("text"), to_count(c.get("recomm")),
+             to_count(c.get("unrecomm")), c.get("date") or None, c.get("sentiment_score"), c.get("reader_loyalty"))
+            for index, c in enumerate(comments)
+        )
+        self._buffer = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        lines = []
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = "\t".join(to_copy_value(value) for value in row) + "\n"
+            lines.append(line)
+            length += len(line)
+            self.count += 1
+        self._buffer += "".join(lines)
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    readline = read
+
+
+def copy_episode_comments(cursor, episode_id, webtoon_name, episode, comments):
+    """회차의 기존 댓글 row를 지우고 comments를 COPY로 한 번에 적재한 뒤 적재한 댓글 수를 반환"""
+    cursor.execute("DELETE FROM webtoon_comments WHERE episode_id = %s;", (episode_id,))
+    stream = CommentCopyStream(episode_id, webtoon_name, episode, comments)
+    cursor.copy_expert(
+        f"COPY webtoon_comments ({', '.join(COMMENT_COPY_COLUMNS)}) FROM STDIN",
+        stream
+    )
+    return stream.count
+
+def insert_episode_data(webtoon_name, episode, processed_data=None):
+    """
+    웹툰 회차 데이터를 DB에 적재하고, 회차가 처음 적재된 시각(created_at)을 반환
+    회차 정보는 webtoon_episodes에, 댓글은 webtoon_comments에 COPY로 적재한다.
+    processed_data가 주어지면 processed 파일 대신 사용
+    """
+    # JSON 데이터 로드
+    if processed_data is not None:
+        interest_count, like_count, rating, trend, comments = get_episode_values(processed_data)
+    else:
+        processed_file = find_comment_file(PROCESSED_DATA_DIR, f"{webtoon_name}_{episode}_processed")
+        if processed_file is None:
+            log(f"파일 없음: {os.path.join(PROCESSED_DATA_DIR, f'{webtoon_name}_{episode}_processed.json')}")
+            log(f"데이터 없음: {webtoon_name} {episode}")
+            return None
+
+        # 댓글은 COPY 하는 동안 한 개씩 읽는다.
+        interest_count, like_count, rating, trend, _ = get_episode_values(read_header(processed_file))
+        comments = iter_comments(processed_file)
     trend_json = json.dumps(trend, ensure_ascii=False)
 
-    # SQL INSERT 수행
+    # SQL INSERT 수행 (이전 버전의 comments JSONB는 비움)
     query = """
-        INSERT INTO webtoon_episodes (webtoon, episode, interest_count, like_count, rating, trend, comments)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        INSERT INTO webtoon_episodes (webtoon, episode, interest_count, like_count, rating, trend)
+        VALUES (%s, %s, %s, %s, %s, %s)
         ON CONFLICT (webtoon, episode) DO UPDATE 
         SET interest_count = EXCLUDED.interest_count,
             like_count = EXCLUDED.like_count,
             rating = EXCLUDED.rating,
             trend = EXCLUDED.trend,
-            comments = EXCLUDED.comments;
+            comments = NULL
+        RETURNING id, created_at;
     """
-    cursor.execute(query, (webtoon_name, episode, interest_count, like_count, rating, trend_json, comments))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-    log(f"DB 저장 완료: {webtoon_name} {episode}")
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (webtoon_name, episode, interest_count, like_count, rating, trend_json))
+        episode_id, created_at = cursor.fetchone()
+        count = copy_episode_comments(cursor, episode_id, webtoon_name, episode, comments)
+
+        conn.commit()
+        cursor.close()
+    log(f"DB 저장 완료: {webtoon_name} {episode} (댓글 {count}개)")
+    return created_at
 
 def main():
     """ 실행 함수 """
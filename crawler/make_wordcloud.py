@@ -1,30 +1,17 @@
 import json
 import os
-from collections import Counter
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from functools import lru_cache
+from crawler.term_index import get_term_index, merge_term_counts
+from visualize import render
 
 # 전역 변수 설정
 INPUT_DIR = os.getenv('PROCESSED_DATA_DIR')
 OUTPUT_DIR = os.getenv('WORDCLOUD_OUTPUT_DIR')
 STOPWORDS = {"너무", "진짜", "그냥", "좀", "더", "이건", "이게", "ㅋㅋ", "근데", "아니", "왜", "이거", "걍", "이제", "한", "것"}
 STOPWORDS_FILE = os.getenv('STOPWORDS_FILE')
-FONT_PATH = os.getenv('FONT_PATH')
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def load_comments(title, episode):
-    """지정된 웹툰과 에피소드의 댓글 데이터를 불러오기"""
-    file_path = os.path.join(INPUT_DIR, f"{title}_{episode}_processed.json")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # 독자 유형별 댓글 분류
-    positive_comments = [comment['text'] for comment in data['comments'] if comment['sentiment_score'] >= 0.4 and '찜' not in comment['text']]
-    negative_comments = [comment['text'] for comment in data['comments'] if comment['sentiment_score'] <= -0.6 and '찜' not in comment['text']]
-
-    return positive_comments, negative_comments
-
 def load_webtoon_stopwords(title):
     """해당 웹툰에 설정된 불용어 불러오기"""
     with open(STOPWORDS_FILE, 'r', encoding='utf-8') as f:
@@ -32,59 +19,45 @@ def load_webtoon_stopwords(title):
 
     return set(stopwords_data.get(title, {}).get("stopwords", []))
 
-def preprocess_text(comments, webtoon_stopwords):
-    """댓글 텍스트 전처리 및 불용어 제거"""
-    all_text = ' '.join(comments)
-    words = all_text.split()
-    filtered_words = [word for word in words if word not in STOPWORDS.union(webtoon_stopwords)]
-    return filtered_words
-
-def generate_combined_wordcloud(title, episode):
+@lru_cache(maxsize=None)
+def get_stopwords(title):
+    """기본 불용어와 웹툰 불용어를 합친 집합 (웹툰마다 한 번만 생성)"""
+    return frozenset(STOPWORDS | load_webtoon_stopwords(title))
+
+def load_word_counts(title, episode, data=None, episodes=None):
+    """
+    워드 클라우드에 쓸 긍정/부정 단어 빈도와 출력 파일 이름을 반환
+    episodes(회차 목록)가 주어지면 해당 회차들(arc, 작품 전체)의 저장된 단어 빈도를 합친다.
+    """
+    # 회차별 단어 빈도 로드 (data가 주어지면 data로 새로 계산) 및 불용어 제거
+    stopwords = get_stopwords(title)
+    if episodes is None:
+        indexes = [get_term_index(title, episode, data)]
+        output_name = f"{title}_{episode}"
+    else:
+        episodes = sorted(episodes)
+        indexes = [get_term_index(title, ep) for ep in episodes]
+        output_name = f"{title}_{episodes[0]}-{episodes[-1]}"
+    positive_word_counts = merge_term_counts(indexes, "positive", stopwords)
+    negative_word_counts = merge_term_counts(indexes, "negative", stopwords)
+    return positive_word_counts, negative_word_counts, output_name
+
+def submit_wordclouds(positive_word_counts, negative_word_counts):
+    """긍정/부정 워드 클라우드 이미지 렌더링을 render pool에 넘기고 Future 두 개를 반환"""
+    return render.submit_wordclouds(positive_word_counts, negative_word_counts)
+
+def save_combined_wordcloud(image_futures, output_name):
+    """두 워드 클라우드 이미지가 모두 만들어지면 하나의 PNG로 결합해 저장하고 경로를 반환"""
+    positive_image, negative_image = (future.result() for future in image_futures)
+    output_file = os.path.join(OUTPUT_DIR, f"{output_name}_combined_wordcloud.png")
+    return render.render_combined_wordcloud(positive_image, negative_image, output_file)
+
+def generate_combined_wordcloud(title, episode, data=None, episodes=None):
     """일반 독자와 충성 독자의 워드 클라우드를 하나의 이미지로 결합"""
-
-    # 댓글 데이터 로드 및 전처리
-    positive_comments, negative_comments = load_comments(title, episode)
-    webtoon_stopwords = load_webtoon_stopwords(title)
-    positive_words = preprocess_text(positive_comments, webtoon_stopwords)
-    negative_words = preprocess_text(negative_comments, webtoon_stopwords)
-    
-    # 긍정 댓글 워드클라우드 생성
-    positive_word_counts = Counter(positive_words)
-    positive_wordcloud = WordCloud(
-        width=600, 
-        height=600, 
-        background_color='white',
-        font_path=FONT_PATH
-    ).generate_from_frequencies(positive_word_counts)
-
-    # 부정 댓글 워드클라우드 생성
-    negative_word_counts = Counter(negative_words)
-    negative_wordcloud = WordCloud(
-        width=600, 
-        height=600, 
-        background_color='white',
-        font_path=FONT_PATH
-    ).generate_from_frequencies(negative_word_counts)
-
-    # 플롯 설정
-    plt.figure(figsize=(14, 7))
-
-    # 긍정 댓글 워드클라우드
-    plt.subplot(1, 2, 1)
-    plt.imshow(positive_wordcloud, interpolation='bilinear')
-    plt.title('Positive comments Word Cloud')
-    plt.axis('off')
-
-    # 부정 댓글 워드클라우드
-    plt.subplot(1, 2, 2)
-    plt.imshow(negative_wordcloud, interpolation='bilinear')
-    plt.title('Negative comments Word Cloud')
-    plt.axis('off')
+    positive_word_counts, negative_word_counts, output_name = load_word_counts(title, episode, data, episodes)
 
     # 저장 및 출력
-    output_file = os.path.join(OUTPUT_DIR, f"{title}_{episode}_combined_wordcloud.png")
-    plt.savefig(output_file)
-    # plt.show()
+    output_file = save_combined_wordcloud(submit_wordclouds(positive_word_counts, negative_word_counts), output_name)
     print(f"워드 클라우드가 {output_file}로 저장되었습니다.")
 
 def main():
@@ -92,7 +65,10 @@ def main():
     episode = 163
 
     # 워드 클라우드 생성 및 저장
-    generate_combined_wordcloud(title, episode)
+    try:
+        generate_combined_wordcloud(title, episode)
+    finally:
+        render.shutdown()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,27 @@
+import argparse
+from db import get_connection, backfill_comments
+
+# 댓글 migration은 db.get_pool()이 process마다 처음 한 번 자동으로 실행하며,
+# 이 스크립트는 옮긴 회차의 comments JSONB를 비우거나(--drop-jsonb) 직접 다시 실행할 때 사용한다.
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def migrate_comments(drop_jsonb=False):
+    """
+    comments JSONB에만 댓글이 있는 회차의 댓글을 webtoon_comments로 옮긴다 (db.backfill_comments).
+    drop_jsonb이면 옮긴 회차의 comments JSONB를 비운다.
+    """
+    with get_connection() as conn:
+        backfill_comments(conn, drop_jsonb)
+    log("댓글 migration 완료")
+
+def main():
+    parser = argparse.ArgumentParser(description="webtoon_episodes.comments(JSONB)를 webtoon_comments 테이블로 옮기기")
+    parser.add_argument("--drop-jsonb", action="store_true", help="옮긴 회차의 comments JSONB 비우기")
+    args = parser.parse_args()
+    migrate_comments(args.drop_jsonb)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+from crawler.extract_comments import scrape_webtoon_comments
+from crawler.comment_api import scrape_webtoon_comments_api
+from crawler.transform_comments import annotate_comments, normalize_episode_counts, save_transformed_data
+from crawler.comment_parquet import parquet_enabled, write_episode_parquet
+from crawler.episode_summary import write_episode_summary
+from sentiment.sentiment_predictor import score_texts, get_sentiment_classifier, SENTIMENT_BATCH_SIZE
+from sentiment.score_cache import SentimentScoreCache
+from sentiment.inference_server import SENTIMENT_SOCKET_PATH
+
+load_dotenv()
+
+# 전역 변수 설정
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH')
+PROCESSED_DATA_DIR = os.getenv('PROCESSED_DATA_DIR')
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 16))
+
+# 수집이 끝났음을 알리는 표시
+_END = object()
+
+# process 안의 모든 consumer(batch에서는 수집 thread마다 하나)가 함께 쓰는 분류기
+# 모델은 한 번만 로드하고, 추론은 한 번에 한 consumer만 수행하도록 lock으로 묶는다.
+_shared_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def score_with_shared_classifier(texts, cache, batch_size=SENTIMENT_BATCH_SIZE):
+    """
+    공유 분류기로 감성 점수 계산 (inference server가 실행 중이면 모델을 로드하지 않고 server에 요청)
+    """
+    global _shared_classifier
+    with _classifier_lock:
+        if _shared_classifier is None and not os.path.exists(SENTIMENT_SOCKET_PATH):
+            _shared_classifier = get_sentiment_classifier(LOCAL_MODEL_PATH)
+        return score_texts(texts, LOCAL_MODEL_PATH, cache, batch_size, classifier=_shared_classifier)
+
+
+class SentimentConsumer(threading.Thread):
+    """
+    queue에서 수집된 댓글 묶음을 꺼내 batch_size 단위로 감성 점수를 계산하는 thread.
+    queue의 크기가 제한되어 있으므로 추론이 밀리면 수집 쪽이 put에서 기다린다.
+    여러 consumer가 동시에 실행되어도 모델은 process에 하나만 로드한다 (score_with_shared_classifier).
+    """
+
+    def __init__(self, comment_queue, batch_size=SENTIMENT_BATCH_SIZE):
+        super().__init__(daemon=True)
+        self.comment_queue = comment_queue
+        self.batch_size = batch_size
+        self.scores = {}
+        self.error = None
+
+    def _score(self, texts, cache):
+        for text, score in zip(texts, score_with_shared_classifier(texts, cache, self.batch_size)):
+            self.scores[text] = score
+
+    def run(self):
+        # SQLite 연결은 만든 thread에서만 사용할 수 있으므로 consumer thread에서 생성
+        cache = SentimentScoreCache()
+        pending = []
+        while True:
+            comments = self.comment_queue.get()
+            if comments is _END:
+                break
+            if self.error is not None:
+                continue    # 오류가 난 뒤에도 수집 쪽이 막히지 않도록 queue는 계속 비운다.
+            try:
+                pending.extend(comment["text"] for comment in comments)
+                while len(pending) >= self.batch_size:
+                    self._score(pending[:self.batch_size], cache)
+                    pending = pending[self.batch_size:]
+            except Exception as e:
+                self.error = e
+
+        if self.error is None and pending:
+            try:
+                self._score(pending, cache)
+            except Exception as e:
+                self.error = e
+        log(f"감성 점수 캐시: {cache.stats()}")
+        cache.close()
+
+
+def run_streaming_pipeline(title, episode, engine="selenium", incremental=False, batch_size=SENTIMENT_BATCH_SIZE,
+                           save=True):
+    """
+    댓글 수집과 감성 분석을 동시에 진행한다.
+    수집기가 페이지마다 넘겨주는 댓글을 크기가 제한된 queue를 통해 감성 분석 thread로 보내고,
+    수집이 끝나면 수집 결과를 기준으로 독자 유형을 분류해 processed 데이터를 반환한다 (save이면 파일로도 저장).
+    """
+    log(f"웹툰 '{title}'의 에피소드 {episode} streaming 처리 시작")
+    comment_queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    consumer = SentimentConsumer(comment_queue, batch_size)
+    consumer.start()
+
+    try:
+        if engine == "api":
+            data = scrape_webtoon_comments_api(title, episode, incremental=incremental, on_comments=comment_queue.put)
+        else:
+            data = scrape_webtoon_comments(title, episode, incremental=incremental, on_comments=comment_queue.put)
+    finally:
+        comment_queue.put(_END)
+        consumer.join()
+    if consumer.error is not None:
+        raise consumer.error
+
+    # 충성 독자 구분에는 가장 오래된 댓글 시각이 필요하므로 수집이 끝난 뒤 분류
+    if data is None:
+        return None
+    comments = data["comments"]
+    # 증분 수집으로 병합된 기존 댓글처럼 streaming 중 점수가 계산되지 않은 댓글은 여기서 계산 (대부분 캐시)
+    missing = list({comment["text"] for comment in comments if comment["text"] not in consumer.scores})
+    if missing:
+        cache = SentimentScoreCache()
+        consumer.scores.update(zip(missing, score_with_shared_classifier(missing, cache, batch_size)))
+        cache.close()
+
+    annotate_comments(comments, [consumer.scores[comment["text"]] for comment in comments])
+    normalize_episode_counts(data)
+    if parquet_enabled():
+        write_episode_parquet(title, episode, comments)
+    write_episode_summary(title, episode, data)
+    if save:
+        output_filename = save_transformed_data(title, episode, data)
+        log(f"업데이트된 파일이 저장되었습니다: {output_filename}")
+    return data
+
+def main():
+    title = '김부장'
+    episode = 167
+    run_streaming_pipeline(title, episode)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import os
+from collections import Counter
+from functools import lru_cache
+from dotenv import load_dotenv
+from crawler.comment_store import processed_comment_path, find_comment_file, iter_comments
+
+load_dotenv()
+
+# 전역 변수 설정
+PROCESSED_DATA_DIR = os.getenv('PROCESSED_DATA_DIR')
+# 회차별 단어 빈도 파일(<제목>_<회차>_terms.json)을 저장할 폴더 (기본값: processed 폴더)
+TERM_INDEX_DIR = os.getenv('TERM_INDEX_DIR') or PROCESSED_DATA_DIR
+# auto: kiwipiepy가 설치되어 있으면 형태소 분석, 없으면 공백 기준 분리 / kiwi / whitespace
+WORDCLOUD_TOKENIZER = os.getenv('WORDCLOUD_TOKENIZER', 'auto')
+
+# 형태소 분석 시 단어 빈도에 포함할 품사 (일반/고유 명사, 형용사, 어근, 외국어)
+KIWI_TAGS = ("NNG", "NNP", "VA", "XR", "SL")
+
+# 감성 구간 (워드 클라우드의 긍정/부정 댓글 기준)
+TERM_BUCKETS = {
+    "positive": lambda score: score >= 0.4,
+    "negative": lambda score: score <= -0.6,
+}
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+
+class WhitespaceTokenizer:
+    """형태소 분석기가 없을 때 사용하는 공백 기준 분리"""
+    name = "whitespace"
+
+    def tokenize(self, texts):
+        for text in texts:
+            yield text.split()
+
+
+class KiwiTokenizer:
+    """kiwipiepy 형태소 분석기 (모델이 패키지에 포함되어 있어 오프라인으로 동작, 조사/어미를 분리)"""
+    name = "kiwi"
+
+    def __init__(self):
+        from kiwipiepy import Kiwi
+        self._kiwi = Kiwi()
+
+    def tokenize(self, texts):
+        for tokens in self._kiwi.tokenize(texts):
+            yield [token.form for token in tokens if token.tag in KIWI_TAGS]
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer():
+    """WORDCLOUD_TOKENIZER 설정에 맞는 tokenizer (process당 한 번만 생성)"""
+    if WORDCLOUD_TOKENIZER in ("auto", "kiwi"):
+        try:
+            return KiwiTokenizer()
+        except ImportError:
+            if WORDCLOUD_TOKENIZER == "kiwi":
+                raise
+            log("kiwipiepy가 설치되어 있지 않아 공백 기준으로 단어를 분리합니다.")
+    return WhitespaceTokenizer()
+
+def term_index_path(title, episode):
+    return os.path.join(TERM_INDEX_DIR, f"{title}_{episode}_terms.json")
+
+def build_term_index(comments, tokenizer=None):
+    """댓글을 감성 구간별로 나누고 한 번에 형태소 분석해 {구간: {단어: 빈도}} 생성 ('찜' 댓글은 제외)"""
+    tokenizer = tokenizer or get_tokenizer()
+    texts = {bucket: [] for bucket in TERM_BUCKETS}
+    for comment in comments:
+        if '찜' in comment['text']:
+            continue
+        for bucket, in_bucket in TERM_BUCKETS.items():
+            if in_bucket(comment['sentiment_score']):
+                texts[bucket].append(comment['text'])
+                break
+
+    index = {}
+    for bucket, bucket_texts in texts.items():
+        counts = Counter()
+        for words in tokenizer.tokenize(bucket_texts):
+            counts.update(words)
+        index[bucket] = dict(counts)
+    return index
+
+def save_term_index(title, episode, index, tokenizer_name):
+    os.makedirs(TERM_INDEX_DIR, exist_ok=True)
+    file_path = term_index_path(title, episode)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"tokenizer": tokenizer_name, "buckets": index}, f, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+    log(f"단어 빈도 저장: {file_path}")
+    return file_path
+
+def load_term_index(title, episode):
+    """
+    저장된 회차별 단어 빈도 (없거나, 다른 tokenizer로 만들었거나, processed 파일보다 오래되었으면 None)
+    """
+    file_path = term_index_path(title, episode)
+    if not os.path.exists(file_path):
+        return None
+    processed_file = find_comment_file(PROCESSED_DATA_DIR, f"{title}_{episode}_processed")
+    if processed_file is not None and os.path.getmtime(processed_file) > os.path.getmtime(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        cached = json.load(f)
+    if cached.get("tokenizer") != get_tokenizer().name:
+        return None
+    return cached["buckets"]
+
+def get_term_index(title, episode, data=None):
+    """
+    회차의 단어 빈도를 가져온다. data(processed 데이터)가 주어지면 data로 새로 만들어 저장하고,
+    아니면 저장된 빈도를 사용하며 없을 때만 processed 파일을 읽어 만든다.
+    """
+    if data is None:
+        index = load_term_index(title, episode)
+        if index is not None:
+            return index
+        comments = iter_comments(processed_comment_path(title, episode))
+    else:
+        comments = data['comments']
+    tokenizer = get_tokenizer()
+    index = build_term_index(comments, tokenizer)
+    save_term_index(title, episode, index, tokenizer.name)
+    return index
+
+def merge_term_counts(indexes, bucket, stopwords=frozenset()):
+    """여러 회차(한 회차, 한 arc, 작품 전체)의 단어 빈도 중 bucket 구간을 합쳐 Counter로 반환 (stopwords 제외)"""
+    merged = Counter()
+    for index in indexes:
+        merged.update(index[bucket])
+    for word in stopwords & merged.keys():
+        del merged[word]
+    return merged
@@ -1,9 +1,14 @@
-import json
-from datetime import datetime, timedelta
+from datetime import timedelta
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
-from sentiment.sentiment_predictor import get_sentiment_score, get_sentiment_classifier
-from tqdm import tqdm
+from sentiment.sentiment_predictor import score_texts, SENTIMENT_BATCH_SIZE
+from sentiment.score_cache import SentimentScoreCache
+from crawler.comment_parquet import parquet_enabled, write_episode_parquet, EpisodeParquetWriter
+from crawler.episode_summary import EpisodeSummaryBuilder, write_episode_summary
+from crawler.comment_store import raw_comment_path, read_header, iter_comments, load_comment_file, save_comment_data, \
+    write_comment_file, to_count
 from dateutil.parser import parse
 
 load_dotenv()
@@ -12,28 +17,116 @@ RAW_DATA_DIR = os.getenv('RAW_DATA_DIR')
 PROCESSED_DATA_DIR = os.getenv('PROCESSED_DATA_DIR')
 LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH')
 
+# 수집기가 저장하는 댓글 date 형식 (예: 2025-02-03T23:00:05+0900)
+COMMENT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+# 가장 오래된 댓글 시각부터 이 시간 안에 작성한 댓글은 충성 독자로 분류
+LOYAL_READER_WINDOW = timedelta(hours=12)
+
 
 def log(message):
     print(f"[LOG] {message}")
 
 def load_comments_json(title, episode):
-    file_path = os.path.join(RAW_DATA_DIR, f"{title}_{episode}.json")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return data
+    return load_comment_file(raw_comment_path(title, episode))
+
+def parse_comment_dates(dates):
+    """
+    댓글 date 목록을 한 번에 UTC 시각 Series로 변환
+    COMMENT_DATE_FORMAT과 형식이 다른 값만 dateutil로 하나씩 변환한다.
+    """
+    dates = pd.Series(dates, dtype=object)
+    parsed = pd.to_datetime(dates, format=COMMENT_DATE_FORMAT, errors="coerce", utc=True)
+    failed = parsed.isna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime([parse(date) for date in dates[failed]], utc=True)
+    return parsed
+
+def classify_reader_loyalty(dates):
+    """
+    최신순 댓글 date 목록으로 댓글마다 독자 유형(충성/일반)을 계산
+    가장 오래된 댓글(마지막 댓글) 시각 + 12시간 이내에 작성한 댓글은 충성 독자로 분류한다.
+    반환: (독자 유형 list, 충성 독자 구분 시간)
+    """
+    parsed = parse_comment_dates(dates)
+    if parsed.empty:
+        return [], None
+    threshold_time = parsed.iloc[-1] + LOYAL_READER_WINDOW
+    return np.where(parsed <= threshold_time, "충성 독자", "일반 독자").tolist(), threshold_time
+
+def normalize_counts(item, fields):
+    """'1,234' 같은 문자열 숫자 field를 int로 변환 (비어 있으면 None)"""
+    for field in fields:
+        if field in item:
+            item[field] = to_count(item[field])
 
-def classify_reader(comment:dict, threshold_time:datetime):
-    comment_time = parse(comment["date"])
-    return "충성 독자" if comment_time <= threshold_time else "일반 독자"
+def normalize_episode_counts(header):
+    """관심 수, 좋아요 수를 int로 변환"""
+    normalize_counts(header, ("interest_count", "like_count"))
 
-def get_threshold_time(comments:list):
-    return parse(comments[-1]["date"]) + timedelta(hours=12)
+def annotate_comments(comments:list, scores:list):
+    """ 댓글마다 감성 점수와 독자 유형(충성/일반)을 추가하고 추천/비추천 수를 int로 변환 """
+    # 충성 독자 구분 (date를 한 번에 변환해 비교)
+    loyalty, threshold_time = classify_reader_loyalty([comment["date"] for comment in comments])
+    log(f"충성 독자 구분 시간: {threshold_time}")
+
+    for comment, score, reader_loyalty in zip(comments, scores, loyalty):
+        comment["sentiment_score"] = score
+        comment["reader_loyalty"] = reader_loyalty
+        normalize_counts(comment, ("recomm", "unrecomm"))
 
 def save_transformed_data(webtoon_name, episode, data:dict):
-    os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
-    output_filename = f"{PROCESSED_DATA_DIR}/{webtoon_name}_{episode}_processed.json"
-    with open(output_filename, 'w', encoding='utf-8') as outfile:
-        json.dump(data, outfile, ensure_ascii=False, indent=4)
+    return save_comment_data(PROCESSED_DATA_DIR, f"{webtoon_name}_{episode}_processed", data)
+
+def stream_transform(title, episode, batch_size=SENTIMENT_BATCH_SIZE, workers=1):
+    """
+    raw 파일을 두 번 순회하며 변환한다. 첫 번째는 댓글 텍스트와 date만 모아 감성 점수와 독자 유형을 계산하고,
+    두 번째는 댓글을 한 개씩 읽어 감성 점수와 독자 유형을 추가한 뒤 바로 processed 파일(과 Parquet 파일)에 쓰고,
+    회차 요약에 필요한 댓글 수를 센다.
+    JSONL 형식이면 댓글 dict 전체를 메모리에 올리지 않는다.
+    """
+    raw_file = raw_comment_path(title, episode)
+    texts, dates = [], []
+    for comment in iter_comments(raw_file):
+        texts.append(comment["text"])
+        dates.append(comment["date"])
+    log(f"총 {len(texts)}개의 댓글 분석 중")
+
+    # 댓글 분석 및 변환 (캐시에 없는 댓글만 batch 단위로 감성 점수 계산)
+    log("감성 점수 계산 중")
+    cache = SentimentScoreCache()
+    scores = score_texts(texts, LOCAL_MODEL_PATH, cache, batch_size, workers)
+    log(f"감성 점수 캐시: {cache.stats()}")
+    cache.close()
+    del texts
+
+    # 충성 독자 구분 (date를 한 번에 변환해 비교)
+    loyalty, threshold_time = classify_reader_loyalty(dates)
+    log(f"충성 독자 구분 시간: {threshold_time}")
+    del dates
+
+    header = read_header(raw_file)
+    normalize_episode_counts(header)
+    summary = EpisodeSummaryBuilder(title, episode)
+
+    def annotated_comments(parquet_writer=None):
+        for comment, score, reader_loyalty in zip(iter_comments(raw_file), scores, loyalty):
+            comment["sentiment_score"] = score
+            comment["reader_loyalty"] = reader_loyalty
+            normalize_counts(comment, ("recomm", "unrecomm"))
+            summary.add(comment)
+            if parquet_writer is not None:
+                parquet_writer.add(comment)
+            yield comment
+
+    if not parquet_enabled():
+        output_filename = write_comment_file(PROCESSED_DATA_DIR, f"{title}_{episode}_processed", header,
+                                             annotated_comments())
+    else:
+        with EpisodeParquetWriter(title, episode) as parquet_writer:
+            output_filename = write_comment_file(PROCESSED_DATA_DIR, f"{title}_{episode}_processed", header,
+                                                 annotated_comments(parquet_writer))
+    summary.save(header)
+    return output_filename
 
 # def classify_readers(webtoon_name, episode):
 #     log("웹툰 데이터 변환 시작")
@@ -67,32 +160,43 @@ def save_transformed_data(webtoon_name, episode, data:dict):
 #     log("웹툰 데이터 변환 완료")
 #     log(f"업데이트된 파일이 저장되었습니다: {output_filename}")
 
-def transform(title, episode):
-    """ 웹툰 댓글 데이터 변환 과정 """
+def transform(title, episode, batch_size=SENTIMENT_BATCH_SIZE, workers=1, data=None, save=True):
+    """
+    웹툰 댓글 데이터 변환 과정
+    data가 주어지면 raw 파일 대신 사용하고, save가 False이면 파일로 저장하지 않고 변환된 data를 반환한다.
+    둘 다 기본값이고 raw 파일이 JSONL 형식이면 파일을 댓글 단위로 읽고 쓰는 stream_transform으로 변환한다.
+    (.json 파일은 두 번 순회하면 매번 전체를 다시 읽으므로 한 번만 읽어 메모리에서 변환한다.)
+    """
     log("웹툰 데이터 변환 시작")
-    data = load_comments_json(title, episode)
+    if data is None and save and not raw_comment_path(title, episode).endswith(".json"):
+        output_filename = stream_transform(title, episode, batch_size, workers)
+        log("웹툰 데이터 변환 완료")
+        log(f"업데이트된 파일이 저장되었습니다: {output_filename}")
+        return None
+    if data is None:
+        data = load_comments_json(title, episode)
     
     comments = data["comments"]
     log(f"총 {len(comments)}개의 댓글 분석 중")
 
-    # 충성 독자 기준 시간 계산
-    threshold_time = get_threshold_time(comments)
-    log(f"충성 독자 구분 시간: {threshold_time}")
-
-    # Sentiment Classifier 로드
-    log("Sentiment Classifier 로딩 중")
-    classifier = get_sentiment_classifier(LOCAL_MODEL_PATH)
-    log("Sentiment Classifier Load 완료")
-
-    # 댓글 분석 및 변환
-    for comment in tqdm(comments):
-        comment["sentiment_score"] = get_sentiment_score(comment["text"], classifier)
-        comment["reader_loyalty"]= classify_reader(comment, threshold_time)
+    # 댓글 분석 및 변환 (캐시에 없는 댓글만 batch 단위로 감성 점수 계산)
+    log("감성 점수 계산 중")
+    cache = SentimentScoreCache()
+    scores = score_texts([comment["text"] for comment in comments], LOCAL_MODEL_PATH, cache, batch_size, workers)
+    log(f"감성 점수 캐시: {cache.stats()}")
+    cache.close()
+    annotate_comments(comments, scores)
+    normalize_episode_counts(data)
+    if parquet_enabled():
+        write_episode_parquet(title, episode, comments)
+    write_episode_summary(title, episode, data)
+    log("웹툰 데이터 변환 완료")
 
     # 변환된 데이터 저장
-    save_transformed_data(title, episode, data)
-    log("웹툰 데이터 변환 완료")
-    log(f"업데이트된 파일이 저장되었습니다: {PROCESSED_DATA_DIR}/{title}_{episode}_processed.json")
+    if save:
+        output_filename = save_transformed_data(title, episode, data)
+        log(f"업데이트된 파일이 저장되었습니다: {output_filename}")
+    return data
 
 def main():
     title = '김부장'
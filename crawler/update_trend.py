@@ -1,11 +1,16 @@
 import json
 import os
 from dotenv import load_dotenv
+from crawler.comment_store import find_comment_file, read_header, iter_comments, load_comment_file, save_comment_data, \
+    write_comment_file
+from crawler.episode_summary import summary_path, load_summary, backfill_summary, write_episode_summary, \
+    negative_comment_ratio
 
 load_dotenv()
 
 PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")  # 댓글 JSON 데이터가 있는 폴더
 EPISODE_DATA_DIR = os.getenv("EPISODE_DATA_DIR")  # 별점 정보가 있는 폴더
+TREND_WINDOW = int(os.getenv("TREND_WINDOW", 5))  # trend에 포함할 최근 회차 수
 
 
 def log(message):
@@ -18,81 +23,100 @@ def load_json(filepath):
         return json.load(f)
 
 
-def save_json(filepath, data):
-    """ JSON 파일 저장 함수 """
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-
-def get_recent_ratings(webtoon_name, current_episode):
-    """ 최근 5화의 별점 데이터를 가져옴 """
+def get_recent_ratings(webtoon_name, current_episode, window=TREND_WINDOW):
+    """ 최근 window화의 현재 별점 데이터를 에피소드 목록 파일에서 가져옴 (파일이 없으면 빈 dict) """
     episode_file = os.path.join(EPISODE_DATA_DIR, f"{webtoon_name}.json")
+    if not os.path.exists(episode_file):
+        return {}
     episode_data = load_json(episode_file)
 
-    # 최근 5화 찾기 (현재 화 포함)
+    # 최근 window화 찾기 (현재 화 포함)
     recent_episodes = {str(ep["episode"]): ep["rating"] for ep in episode_data["episodes"]}
     recent_ratings = {
         ep: recent_episodes[ep]
         for ep in sorted(recent_episodes.keys(), key=int, reverse=True)
-        if int(ep) >= current_episode - 4 and int(ep) <= current_episode
+        if int(ep) >= current_episode - window + 1 and int(ep) <= current_episode
     }
 
     return recent_ratings
 
-def get_recent_negative_comment_ratios(webtoon_name, current_episode):
-    """ 최근 5화의 부정적 댓글 비율을 가져옴 """
-    negative_ratios = {}
-
-    for ep in range(current_episode - 4, current_episode + 1):
-        file_path = os.path.join(PROCESSED_DATA_DIR, f"{webtoon_name}_{ep}_processed.json")
-
-        if not os.path.exists(file_path):
-            log(f"파일 없음: {file_path}")
-            continue    # 해당 화의 데이터가 없으면 건너뜀
-
-        data = load_json(file_path)
-        comments = data.get("comments", [])
-
-        if not comments:
-            negative_ratios[str(ep)] = 0    # 댓글이 없으면 부정 비율 0%
+def get_recent_summaries(webtoon_name, current_episode, window=TREND_WINDOW):
+    """
+    최근 window화의 요약 record를 가져옴 (회차 -> 요약)
+    요약 파일이 없는 회차는 processed 파일이 있으면 한 번 만들어 저장하고, 없으면 건너뜀
+    """
+    summaries = {}
+    for ep in range(current_episode, current_episode - window, -1):
+        summary = load_summary(webtoon_name, ep) or backfill_summary(webtoon_name, ep)
+        if summary is None:
+            log(f"요약 없음: {summary_path(webtoon_name, ep)}")
             continue
-
-        # sentiment_score -0.5 이하인 댓글 수 계산
-        negative_comments = sum(1 for c in comments if c.get("sentiment_score", 0) <= -0.5)
-        total_comments = len(comments)
-
-        # 부정 댓글 비율 계산 (소수점 둘째 자리까지)
-        negative_ratios[str(ep)] = round(negative_comments / total_comments * 100, 2) if total_comments > 0 else 0
-
-    return negative_ratios
-
-def update_comments_with_trend(webtoon_name, episode):
-    """ 댓글 JSON 파일을 업데이트하여 trend(추이) 필드 추가 """
-    processed_file = os.path.join(PROCESSED_DATA_DIR, f"{webtoon_name}_{episode}_processed.json")
-
-    # 댓글 JSON 파일 로드
-    if not os.path.exists(processed_file):
-        log(f"파일 없음: {processed_file}")
+        summaries[ep] = summary
+    return summaries
+
+def get_trend(webtoon_name, current_episode, window=TREND_WINDOW):
+    """
+    최근 window화의 별점과 부정 댓글 비율 (최신 회차부터)
+    별점은 에피소드 목록 파일을 한 번 읽어 현재 값을 사용하고, 부정 댓글 비율은 회차별 요약 record에서 계산한다.
+    요약 파일이 없는 회차는 get_recent_summaries에서 processed 파일로 한 번 만들어 두며 (backfill_summary),
+    processed 파일도 없는 회차는 부정 댓글 비율을 "N/A"로 둔다.
+    에피소드 목록에 없는 회차는 요약에 저장된 수집 당시 별점을 사용한다.
+    요약의 별점만 쓰면 파일을 읽지 않아도 되지만 전처리 이후 바뀐 별점이 반영되지 않으므로,
+    trend마다 에피소드 목록 파일 하나를 읽는 비용을 감수하고 현재 별점을 사용한다.
+    (회차 수만큼 processed 파일을 읽던 방식과 달리 읽는 양은 window와 상관없이 일정하다.)
+    """
+    summaries = get_recent_summaries(webtoon_name, current_episode, window)
+    recent_ratings = get_recent_ratings(webtoon_name, current_episode, window)
+
+    trend = {}
+    for ep in range(current_episode, current_episode - window, -1):
+        summary = summaries.get(ep)
+        rating = recent_ratings.get(str(ep))
+        if rating is None and summary is not None:
+            rating = summary["rating"]
+        if rating is None:
+            continue
+        trend[str(ep)] = {
+            "rating": rating,
+            "negative_comment_ratio": negative_comment_ratio(summary) if summary is not None else "N/A"
+        }
+    return trend
+
+def update_comments_with_trend(webtoon_name, episode, data=None):
+    """
+    댓글 JSON 파일을 업데이트하여 trend(추이) 필드 추가
+    data(변환된 데이터)가 주어지면 파일을 다시 읽지 않고 trend를 추가해 저장하고 data를 반환한다.
+    data가 없으면 processed 파일을 댓글 단위로 읽으며 trend가 추가된 파일로 다시 쓴다.
+    (.json 파일은 댓글 단위로 읽을 수 없으므로 한 번만 읽어 data와 같은 방식으로 저장한다.)
+    """
+    name = f"{webtoon_name}_{episode}_processed"
+    processed_file = find_comment_file(PROCESSED_DATA_DIR, name)
+
+    # 댓글 JSON 파일 확인
+    if data is None and processed_file is None:
+        log(f"파일 없음: {os.path.join(PROCESSED_DATA_DIR, f'{name}.json')}")
         return
+    loaded = data is None and processed_file.endswith(".json")
+    if loaded:
+        data = load_comment_file(processed_file)
 
-    data = load_json(processed_file)
-
-    # 최근 5화 별점 및 부정 댓글 비율 가져오기
-    recent_ratings = get_recent_ratings(webtoon_name, episode)
-    recent_negative_ratios = get_recent_negative_comment_ratios(webtoon_name, episode)
+    # 현재 화의 요약은 transform에서 저장되지만, 없으면 data로 만든다.
+    if data is not None and not loaded and load_summary(webtoon_name, episode) is None:
+        write_episode_summary(webtoon_name, episode, data)
 
-    # trend 필드 추가
-    data["trend"] = {
-        ep: {
-            "rating": recent_ratings.get(ep, "N/A"),
-            "negative_comment_ratio": recent_negative_ratios.get(ep, "N/A")
-        }
-        for ep in recent_ratings.keys()
-    }
+    # 최근 5화 별점 및 부정 댓글 비율로 trend 필드 추가
+    trend = get_trend(webtoon_name, episode)
 
     # 업데이트된 JSON 저장
-    save_json(processed_file, data)
+    if data is not None:
+        data["trend"] = trend
+        processed_file = save_comment_data(PROCESSED_DATA_DIR, name, data)
+    else:
+        header = read_header(processed_file)
+        header["trend"] = trend
+        processed_file = write_comment_file(PROCESSED_DATA_DIR, name, header, iter_comments(processed_file))
     log(f"업데이트 완료: {processed_file}")
+    return None if loaded else data
 
 
 if __name__ == "__main__":
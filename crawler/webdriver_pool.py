@@ -0,0 +1,161 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 전역 변수 설정
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
+WEBDRIVER_POOL_SIZE = int(os.getenv('WEBDRIVER_POOL_SIZE', 2))
+# session을 새로 만들기 전까지 허용하는 페이지 로드 + 더보기 클릭 수
+WEBDRIVER_MAX_PAGES = int(os.getenv('WEBDRIVER_MAX_PAGES', 500))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def resolve_driver_path():
+    """
+    chromedriver 경로를 process당 한 번만 확인한다.
+    CHROMEDRIVER_PATH가 설정되어 있으면 그대로 사용하고, 없으면 ChromeDriverManager로 설치한다.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = CHROMEDRIVER_PATH or ChromeDriverManager().install()
+            log(f"chromedriver 경로: {_driver_path}")
+        return _driver_path
+
+def create_webdriver():
+    """Selenium 웹드라이버 생성 및 설정"""
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')  # 브라우저를 띄우지 않고 실행
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+
+
+class WebDriverPool:
+    """
+    headless Chrome session을 재사용하는 pool.
+    최대 size개의 session을 유지하며, 꺼낼 때마다 응답 여부를 확인하고
+    페이지 로드와 더보기 클릭을 합해 max_pages번 넘게 사용한 session은 종료 후 새로 만든다.
+    사용 중 예외가 발생한 session은 상태를 알 수 없으므로 pool에 돌려놓지 않고 종료한다.
+    """
+
+    def __init__(self, size=WEBDRIVER_POOL_SIZE, max_pages=WEBDRIVER_MAX_PAGES):
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create(self):
+        driver = create_webdriver()
+        self._uses[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1;") == 1
+        except WebDriverException:
+            return False
+
+    def acquire(self):
+        """사용 가능한 session을 꺼낸다. 모든 session이 사용 중이면 반환될 때까지 기다린다."""
+        if self._closed:
+            raise RuntimeError("WebDriverPool is closed")
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._create()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                driver = self._idle.get()
+
+            if self._is_healthy(driver):
+                return driver
+            log("응답하지 않는 브라우저 session 교체")
+            self._discard(driver)
+
+    def record_page(self, driver, count=1):
+        """session에서 페이지를 로드(또는 더보기를 클릭)한 횟수를 기록 (pool에서 꺼낸 session이 아니면 무시)"""
+        if id(driver) in self._uses:
+            self._uses[id(driver)] += count
+
+    def release(self, driver, failed=False):
+        """session을 pool에 반환한다. max_pages번 넘게 사용했거나 사용 중 예외가 발생한 session은 종료한다."""
+        if failed:
+            log("예외가 발생한 브라우저 session 종료")
+        if failed or self._closed or self._uses.get(id(driver), 0) >= self.max_pages:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, failed=True)
+            raise
+        self.release(driver)
+
+    def close(self):
+        """대기 중인 session을 모두 종료한다. 사용 중인 session은 반환될 때 종료된다."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+def record_page(driver, count=1):
+    """기본 pool의 session에서 페이지를 로드한 횟수를 기록"""
+    if _default_pool is not None:
+        _default_pool.record_page(driver, count)
+
+def get_default_pool():
+    """process 전체에서 공유하는 WebDriverPool (process 종료 시 자동으로 정리)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WebDriverPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -1,19 +1,46 @@
 import json
-import tiktoken
+import argparse
+from datetime import datetime
+from crawler.comment_store import processed_comment_path, iter_comments, read_header, load_comment_file
+from create_report.prompt_builder import count_tokens, get_token_budget
 
-# Load the JSON file
-file_path = 'crawler/comments_processed_data/배달왕_80_processed.json'  # 파일 경로를 입력하세요
-with open(file_path, 'r', encoding='utf-8') as file:
-    data = json.load(file)
+# processed 댓글 데이터와 보고서 프롬프트의 token 수를 확인하는 스크립트
+# 사용 예:
+#   python -m create_report.count_tokens --file crawler/comments_processed_data/배달왕_80_processed.jsonl
+#   python -m create_report.count_tokens --title 배달왕 --episode 80
 
-# Convert JSON content to a string
-json_string = json.dumps(data, ensure_ascii=False)
 
-# Initialize tiktoken encoder for GPT-4
-encoding = tiktoken.encoding_for_model("gpt-4")
+def count_file_tokens(file_path, model):
+    """processed 댓글 파일 전체(회차 정보 + 댓글)의 token 수 (댓글을 한 개씩 읽으며 셈)"""
+    total = count_tokens(json.dumps(read_header(file_path), ensure_ascii=False), model)
+    comment_count = 0
+    for comment in iter_comments(file_path):
+        total += count_tokens(json.dumps(comment, ensure_ascii=False), model)
+        comment_count += 1
+    return total, comment_count
 
-# Count tokens in the string
-tokens = encoding.encode(json_string)
-token_count = len(tokens)
+def main():
+    parser = argparse.ArgumentParser(description="댓글 데이터와 보고서 프롬프트의 token 수 확인")
+    parser.add_argument("--file", help="processed 댓글 파일 경로")
+    parser.add_argument("--title", help="웹툰 제목 (--episode와 함께 사용)")
+    parser.add_argument("--episode", type=int, help="회차")
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
 
-print(f"토큰 수: {token_count}")
\ No newline at end of file
+    file_path = args.file
+    if not file_path and args.title and args.episode is not None:
+        file_path = processed_comment_path(args.title, args.episode)
+    if not file_path:
+        parser.error("--file 또는 --title/--episode를 지정해야 합니다.")
+
+    total, comment_count = count_file_tokens(file_path, args.model)
+    print(f"토큰 수: {total} (댓글 {comment_count}개, {file_path})")
+
+    if args.title and args.episode is not None:
+        from create_report.gptapi_report import generate_prompt
+        prompt = generate_prompt(args.title, args.episode, load_comment_file(file_path), datetime.now())
+        if prompt:
+            print(f"프롬프트 토큰 수: {count_tokens(prompt, args.model)} (예산 {get_token_budget(args.model)})")
+
+if __name__ == "__main__":
+    main()
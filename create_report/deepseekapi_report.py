@@ -1,20 +1,21 @@
 import json
-import psycopg2
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
+from db import get_connection
+from create_report.response_cache import ResponseCache, prompt_hash
+from create_report.prompt_builder import build_prompt, FEEDBACK_SCORE_THRESHOLD, FEEDBACK_CANDIDATE_LIMIT
 
 load_dotenv()
 
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-
 # DeepSeek API 설정
-DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+PROVIDER = "deepseek"
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+BASE_URL = DEEPSEEK_BASE_URL
 API_KEY = os.getenv("DEEPSEEK_API_KEY")
+MODEL = "deepseek-chat"
+SYSTEM_MESSAGE = "You are a helpful assistant."
+COMPLETION_OPTIONS = {"stream": False}
 
 # OpenAI 클라이언트 초기화 (DeepSeek 사용)
 client = OpenAI(api_key=API_KEY, base_url=DEEPSEEK_BASE_URL)
@@ -39,21 +40,29 @@ def load_prompt():
 
 def fetch_webtoon_row(title, episode):
     """PostgreSQL에서 특정 웹툰의 특정 회차 데이터 가져오기"""
-    conn = psycopg2.connect(
-        dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
-    )
-    cursor = conn.cursor()
-
     query = """
-        SELECT webtoon, episode, interest_count, like_count, rating, trend, comments, created_at FROM webtoon_episodes 
+        SELECT webtoon, episode, interest_count, like_count, rating, trend, NULL AS comments, created_at 
+        FROM webtoon_episodes 
         WHERE webtoon = %s AND episode = %s;
     """
 
-    cursor.execute(query, (title, episode))
-    data = cursor.fetchone()
-    
-    conn.close()
-    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (title, episode))
+        data = cursor.fetchone()
+
+        # 프롬프트 후보 댓글(감성 점수의 절댓값이 큰 댓글)만 순위대로 최대 FEEDBACK_CANDIDATE_LIMIT개 가져옴
+        if data:
+            cursor.execute("""
+                SELECT text, sentiment_score, recomm FROM webtoon_comments
+                WHERE webtoon = %s AND episode = %s AND abs(sentiment_score) >= %s
+                ORDER BY abs(sentiment_score) DESC, recomm DESC NULLS LAST
+                LIMIT %s;
+            """, (title, episode, FEEDBACK_SCORE_THRESHOLD, FEEDBACK_CANDIDATE_LIMIT))
+            comments = [{"text": text, "sentiment_score": score, "recomm": recomm}
+                        for text, score, recomm in cursor.fetchall()]
+            data = data[:6] + (comments,) + data[7:]
+
     if not data:
         log(f"❌ {title} {episode}화의 데이터를 찾을 수 없습니다.")
         return None
@@ -73,43 +82,47 @@ def generate_prompt(title, episode):
     webtoon, episode, interest_count, like_count, rating, trend, comments, created_at = webtoon_data
 
     # DeepSeek 프롬프트 구성
-    prompt = f"{prompt_text}\n\n"
-    prompt += f"### {webtoon} {episode}화 독자 반응 데이터\n"
-    prompt += f"- 관심 수: {interest_count}\n"
-    prompt += f"- 좋아요 수: {like_count}\n"
-    prompt += f"- 평점: {rating}\n"
-    prompt += f"- 트렌드 분석 데이터: {trend}\n"
-    prompt += f"- 데이터 기록 시간: {created_at}\n\n"
-
-    # 부정적 댓글만 추출
+    header_lines = [
+        f"### {webtoon} {episode}화 독자 반응 데이터",
+        f"- 관심 수: {interest_count}",
+        f"- 좋아요 수: {like_count}",
+        f"- 평점: {rating}",
+        f"- 트렌드 분석 데이터: {trend}",
+        f"- 데이터 기록 시간: {created_at}",
+    ]
+
     try:
-        comment_list = json.loads(comments)
-        negative_comments = [c["text"] for c in comment_list if c["sentiment_score"] <= -0.5]
+        comment_list = json.loads(comments) if isinstance(comments, str) else list(comments)
     except (json.JSONDecodeError, TypeError):
         log("❌ 댓글 데이터 로드 실패")
-        negative_comments = []
+        comment_list = []
 
-    if negative_comments:
-        prompt += "- 대표적인 독자 피드백: \n"
-        for comment in negative_comments[:5]:  # 최대 5개 샘플링
-            prompt += f"  - {comment}\n"
-    else:
-        prompt += "- 부정적인 댓글이 거의 없습니다.\n"
+    # token 예산 안에서 감성이 뚜렷하고 추천이 많은 댓글 순서로 중복 없이 추가
+    prompt, _ = build_prompt(prompt_text, header_lines, [c for c in comment_list if isinstance(c, dict)], MODEL)
 
     return prompt
 
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt},
+    ]
+
+def parse_response(content):
+    return content
+
 def deepseek_analyze(prompt):
-    """DeepSeek API를 호출하여 웹툰 분석 수행"""
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt},
-        ],
-        stream=False
-    )
-
-    return response.choices[0].message.content
+    """DeepSeek API를 호출하여 웹툰 분석 수행 (같은 프롬프트의 응답은 캐시에서 가져옴)"""
+    messages = build_messages(prompt)
+    key = prompt_hash(messages, COMPLETION_OPTIONS)
+    cache = ResponseCache()
+    content = cache.get(PROVIDER, MODEL, key)
+    if content is None:
+        response = client.chat.completions.create(model=MODEL, messages=messages, **COMPLETION_OPTIONS)
+        content = parse_response(response.choices[0].message.content)
+        cache.put(PROVIDER, MODEL, key, content, response.usage)
+    cache.close()
+    return content
 
 
 def save_report(title, episode, content):
@@ -1,23 +1,25 @@
 import json
-import psycopg2
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
+from db import get_connection
+from crawler.load_comments import get_episode_values
+from create_report.response_cache import ResponseCache, prompt_hash
+from create_report.prompt_builder import build_prompt, FEEDBACK_SCORE_THRESHOLD, FEEDBACK_CANDIDATE_LIMIT
 
 load_dotenv()
 
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-
-# OpenAI API 설정
+# OpenAI API 설정 (OPENAI_BASE_URL을 설정하면 호환 server로 요청)
+PROVIDER = "openai"
 API_KEY = os.getenv("OPENAI_API_KEY")
+BASE_URL = os.getenv("OPENAI_BASE_URL")
 GPT_MODEL = "gpt-4o"  # 또는 "gpt-3.5-turbo"
+MODEL = GPT_MODEL
+SYSTEM_MESSAGE = "You are a professional data analyst specializing in user feedback analysis."
+COMPLETION_OPTIONS = {"max_tokens": 1500, "temperature": 0.7}
 
 # OpenAI 클라이언트 초기화
-client = OpenAI(api_key=API_KEY)
+client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
 
 # 보고서 저장 경로
 PROMPT_FILE = os.getenv("PROMPT_FILE_PATH")
@@ -38,21 +40,28 @@ def load_prompt():
 
 def fetch_webtoon_row(title, episode):
     """PostgreSQL에서 특정 웹툰의 특정 회차 데이터 가져오기"""
-    conn = psycopg2.connect(
-        dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
-    )
-    cursor = conn.cursor()
-
     query = """
-        SELECT webtoon, episode, interest_count, like_count, rating, trend, comments, created_at 
+        SELECT webtoon, episode, interest_count, like_count, rating, trend, NULL AS comments, created_at 
         FROM webtoon_episodes 
         WHERE webtoon = %s AND episode = %s;
     """
 
-    cursor.execute(query, (title, episode))
-    data = cursor.fetchone()
-    
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (title, episode))
+        data = cursor.fetchone()
+
+        # 프롬프트 후보 댓글(감성 점수의 절댓값이 큰 댓글)만 순위대로 최대 FEEDBACK_CANDIDATE_LIMIT개 가져옴
+        if data:
+            cursor.execute("""
+                SELECT text, sentiment_score, recomm FROM webtoon_comments
+                WHERE webtoon = %s AND episode = %s AND abs(sentiment_score) >= %s
+                ORDER BY abs(sentiment_score) DESC, recomm DESC NULLS LAST
+                LIMIT %s;
+            """, (title, episode, FEEDBACK_SCORE_THRESHOLD, FEEDBACK_CANDIDATE_LIMIT))
+            comments = [{"text": text, "sentiment_score": score, "recomm": recomm}
+                        for text, score, recomm in cursor.fetchall()]
+            data = data[:6] + (comments,) + data[7:]
 
     if not data:
         log(f"❌ {title} {episode}화의 데이터를 찾을 수 없습니다.")
@@ -60,25 +69,32 @@ def fetch_webtoon_row(title, episode):
     
     return data
 
-def generate_prompt(title, episode):
-    """GPT API 요청을 위한 프롬프트 생성"""
+def generate_prompt(title, episode, data=None, created_at=None):
+    """
+    GPT API 요청을 위한 프롬프트 생성
+    data(processed 데이터)와 created_at(DB 적재 시각)이 주어지면 DB를 조회하지 않는다.
+    """
     prompt_text = load_prompt()
     if not prompt_text:
         return None
     
-    webtoon_data = fetch_webtoon_row(title, episode)
+    if data is not None and created_at is not None:
+        webtoon_data = (title, episode, *get_episode_values(data), created_at)
+    else:
+        webtoon_data = fetch_webtoon_row(title, episode)
     if not webtoon_data:
         return None
 
     webtoon, episode, interest_count, like_count, rating, trend, comments, created_at = webtoon_data
 
-    prompt = f"{prompt_text}\n\n"
-    prompt += f"### {webtoon} {episode}화 독자 반응 데이터\n"
-    prompt += f"- 관심 수: {interest_count}\n"
-    prompt += f"- 좋아요 수: {like_count}\n"
-    prompt += f"- 평점: {rating}\n"
-    prompt += f"- 트렌드 분석 데이터: {trend}\n"
-    prompt += f"- 데이터 기록 시간: {created_at}\n\n"
+    header_lines = [
+        f"### {webtoon} {episode}화 독자 반응 데이터",
+        f"- 관심 수: {interest_count}",
+        f"- 좋아요 수: {like_count}",
+        f"- 평점: {rating}",
+        f"- 트렌드 분석 데이터: {trend}",
+        f"- 데이터 기록 시간: {created_at}",
+    ]
 
     # JSON 파싱 예외 처리
     try:
@@ -94,31 +110,31 @@ def generate_prompt(title, episode):
         print(f"[ERROR] {episode}화 댓글 데이터 로드 실패: {e}")
         comment_list = []
 
-    # 부정적 댓글만 추출
-    negative_comments = [c["text"] for c in comment_list if isinstance(c, dict) and c.get("sentiment_score", 0) <= -0.5]
+    # token 예산 안에서 감성이 뚜렷하고 추천이 많은 댓글 순서로 중복 없이 추가
+    prompt, _ = build_prompt(prompt_text, header_lines, [c for c in comment_list if isinstance(c, dict)], GPT_MODEL)
+    return prompt
 
-    if negative_comments:
-        prompt += "- 대표적인 독자 피드백: \n"
-        for comment in negative_comments[:5]:  # 최대 5개 샘플링
-            prompt += f"  - {comment}\n"
-    else:
-        prompt += "- 부정적인 댓글이 거의 없습니다.\n"
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
 
-    return prompt
+def parse_response(content):
+    return content.strip()
 
 def gpt_analyze(prompt):
-    """GPT API를 호출하여 웹툰 분석 수행"""
-    response = client.chat.completions.create(
-        model=GPT_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a professional data analyst specializing in user feedback analysis."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=1500,
-        temperature=0.7
-    )
-
-    return response.choices[0].message.content.strip()
+    """GPT API를 호출하여 웹툰 분석 수행 (같은 프롬프트의 응답은 캐시에서 가져옴)"""
+    messages = build_messages(prompt)
+    key = prompt_hash(messages, COMPLETION_OPTIONS)
+    cache = ResponseCache()
+    content = cache.get(PROVIDER, GPT_MODEL, key)
+    if content is None:
+        response = client.chat.completions.create(model=GPT_MODEL, messages=messages, **COMPLETION_OPTIONS)
+        content = parse_response(response.choices[0].message.content)
+        cache.put(PROVIDER, GPT_MODEL, key, content, response.usage)
+    cache.close()
+    return content
 
 def save_report(title, episode, content):
     """분석 결과를 보고서 파일로 저장"""
@@ -129,9 +145,9 @@ def save_report(title, episode, content):
         f.write(content)
 
 
-def gpt_report(title, episode):
+def gpt_report(title, episode, data=None, created_at=None):
     """웹툰 데이터를 가져와 GPT 분석 후 저장"""
-    prompt = generate_prompt(title, episode)
+    prompt = generate_prompt(title, episode, data, created_at)
     if not prompt:
         return
 
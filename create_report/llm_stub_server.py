@@ -0,0 +1,88 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# OpenAI 호환 /v1/chat/completions를 흉내 내는 로컬 stand-in server
+# 실제 API 대신 고정된 형식의 보고서를 돌려주며, 지연 시간과 429/5xx 오류를 섞어 재시도/동시성 동작을 확인할 수 있다.
+#
+# report_engine.py(와 gptapi_report.py)를 이 server로 향하게 하려면 다음 환경 변수를 설정한다.
+#   OPENAI_BASE_URL=http://127.0.0.1:8001/v1
+#   OPENAI_API_KEY=local
+# DeepSeek 모듈은 DEEPSEEK_BASE_URL=http://127.0.0.1:8001/v1 로 설정한다.
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def make_handler(latency, error_rate, stats):
+    class ChatCompletionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404, f"unknown path: {self.path}")
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            with stats['lock']:
+                stats['requests'] += 1
+
+            time.sleep(latency)
+            if random.random() < error_rate:
+                status = random.choice([429, 500, 503])
+                with stats['lock']:
+                    stats['errors'] += 1
+                self._send_json(status, {"error": {"message": "stand-in server error", "code": status}},
+                                {"Retry-After": "0"} if status == 429 else None)
+                return
+
+            prompt = request.get('messages', [{}])[-1].get('content', '')
+            content = f"# 분석 보고서 (stand-in)\n\n- 프롬프트 길이: {len(prompt)}자\n"
+            self._send_json(200, {
+                "id": f"chatcmpl-local-{stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get('model', 'local'),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content),
+                          "total_tokens": len(prompt) + len(content)},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return ChatCompletionHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 chat completions stand-in server")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help='응답마다 기다리는 시간 (초)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='429/500/503 오류를 돌려줄 비율 (0~1)')
+    args = parser.parse_args()
+
+    stats = {'requests': 0, 'errors': 0, 'lock': threading.Lock()}
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.latency, args.error_rate, stats))
+    log(f"LLM stand-in server 실행 중: http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        log(f"요청 {stats['requests']}개, 오류 {stats['errors']}개")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import os
+import re
+from functools import lru_cache
+from dotenv import load_dotenv
+from sentiment.score_cache import normalize_text
+from crawler.comment_store import to_count
+
+load_dotenv()
+
+# 전역 변수 설정
+# 모델별 프롬프트 token 예산 (REPORT_PROMPT_TOKENS를 설정하면 모든 모델에 같은 예산 사용)
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o": 4000,
+    "deepseek-chat": 4000,
+}
+DEFAULT_TOKEN_BUDGET = 4000
+REPORT_PROMPT_TOKENS = os.getenv('REPORT_PROMPT_TOKENS')
+# 프롬프트에 넣을 댓글 후보 기준 (|sentiment_score|가 이 값 이상인 댓글)
+FEEDBACK_SCORE_THRESHOLD = 0.5
+# 예산과 상관없이 프롬프트에 넣을 최대 댓글 수
+MAX_FEEDBACK_COMMENTS = int(os.getenv('REPORT_MAX_FEEDBACK_COMMENTS', 100))
+# 순위를 매긴 뒤 프롬프트에 넣을지 검사할 최대 후보 수 (DB에서도 이만큼만 가져옴)
+FEEDBACK_CANDIDATE_LIMIT = 500
+# 댓글 한 줄("  - ...\n")에 필요한 최소 token 수 (남은 예산이 이보다 작으면 더 검사하지 않음)
+MIN_LINE_TOKENS = 4
+# 글자 3-gram 집합의 Jaccard 유사도가 이 값 이상이면 거의 같은 댓글로 보고 제외
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+@lru_cache(maxsize=None)
+def get_encoder(model):
+    """모델의 tiktoken encoder (process당 모델마다 한 번만 생성, 모르는 모델은 o200k_base 사용)"""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text, model):
+    return len(get_encoder(model).encode(text))
+
+def get_token_budget(model):
+    if REPORT_PROMPT_TOKENS:
+        return int(REPORT_PROMPT_TOKENS)
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+def rank_comments(comments):
+    """|sentiment_score|가 큰 순서, 같으면 추천 수가 많은 순서로 정렬한 후보 댓글 list"""
+    candidates = [c for c in comments if abs(c.get("sentiment_score") or 0) >= FEEDBACK_SCORE_THRESHOLD]
+    return sorted(candidates, key=lambda c: (abs(c["sentiment_score"]), to_count(c.get("recomm")) or 0), reverse=True)
+
+def _shingles(text):
+    """중복 판단용 글자 3-gram 집합 (공백, 문장 부호를 지우고 'ㅋㅋㅋㅋ' 같은 반복 글자는 두 글자로 줄임)"""
+    text = re.sub(r"[\W_]+", "", normalize_text(text).lower())
+    text = re.sub(r"(.)\1{2,}", r"\1\1", text)
+    if len(text) < 3:
+        return {text}
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def is_near_duplicate(shingles, kept):
+    for other in kept:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= NEAR_DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+def build_prompt(prompt_text, header_lines, comments, model, budget=None):
+    """
+    프롬프트 템플릿, 회차 정보, 댓글로 token 예산 안의 프롬프트를 만든다.
+    댓글은 rank_comments 순서로 상위 FEEDBACK_CANDIDATE_LIMIT개만 검사하며, 거의 같은 댓글을 빼고 예산이 찰 때까지 넣는다.
+    반환: (프롬프트, {"tokens", "budget", "comments", "candidates"})
+    """
+    budget = budget or get_token_budget(model)
+    base = f"{prompt_text}\n\n" + "".join(f"{line}\n" for line in header_lines) + "\n"
+    sections = {"negative": [], "positive": []}
+    # 섹션 제목과 '부정적인 댓글이 거의 없습니다' 같은 안내 문구가 들어갈 자리를 미리 남겨 둠
+    used = count_tokens(base, model) + 40
+
+    ranked = rank_comments(comments)
+    kept_shingles = []
+    included = 0
+    for comment in ranked[:FEEDBACK_CANDIDATE_LIMIT]:
+        if included >= MAX_FEEDBACK_COMMENTS or budget - used < MIN_LINE_TOKENS:
+            break
+        shingles = _shingles(comment["text"])
+        if is_near_duplicate(shingles, kept_shingles):
+            continue
+        line = f"  - {comment['text']}\n"
+        line_tokens = count_tokens(line, model)
+        if used + line_tokens > budget:
+            continue
+        used += line_tokens
+        kept_shingles.append(shingles)
+        sections["negative" if comment["sentiment_score"] < 0 else "positive"].append(line)
+        included += 1
+
+    prompt = base
+    if sections["negative"]:
+        prompt += "- 대표적인 부정적 독자 피드백: \n" + "".join(sections["negative"])
+    else:
+        prompt += "- 부정적인 댓글이 거의 없습니다.\n"
+    if sections["positive"]:
+        prompt += "- 대표적인 긍정적 독자 피드백: \n" + "".join(sections["positive"])
+
+    stats = {"tokens": count_tokens(prompt, model), "budget": budget, "comments": included,
+             "candidates": len(ranked)}
+    log(f"프롬프트 크기: {stats['tokens']} tokens (예산 {budget}), 댓글 {included}/{len(ranked)}개 사용")
+    return prompt, stats
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import time
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from create_report.response_cache import ResponseCache, prompt_hash
+from create_report.prompt_builder import count_tokens
+
+load_dotenv()
+
+# 전역 변수 설정
+REPORT_CONCURRENCY = int(os.getenv('REPORT_CONCURRENCY', 4))  # 동시에 진행할 API 요청 수
+REPORT_RPM = int(os.getenv('REPORT_RPM', 60))  # 분당 요청 수 제한
+REPORT_TPM = int(os.getenv('REPORT_TPM', 30000))  # 분당 token 수 제한 (프롬프트 + 최대 응답 token)
+REPORT_MAX_RETRIES = int(os.getenv('REPORT_MAX_RETRIES', 5))
+REPORT_RETRY_BASE = float(os.getenv('REPORT_RETRY_BASE', 1.0))  # 재시도 대기 시간의 기준 (초)
+REPORT_RETRY_MAX = float(os.getenv('REPORT_RETRY_MAX', 60.0))
+# max_tokens를 지정하지 않는 provider의 응답 token 추정치
+DEFAULT_COMPLETION_TOKENS = 1500
+
+# provider 이름 -> 프롬프트 생성/보고서 저장을 담당하는 모듈
+PROVIDER_MODULES = {
+    "openai": "create_report.gptapi_report",
+    "deepseek": "create_report.deepseekapi_report",
+}
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+def retry_delay(error, attempt):
+    """
+    재시도할 오류(429, 5xx, 연결 오류)이면 다음 요청까지 기다릴 시간(초), 아니면 None
+    지수적으로 늘어나는 대기 시간 안에서 무작위로 고르며(full jitter), Retry-After 헤더가 있으면 그보다 짧게 기다리지 않는다.
+    """
+    status = getattr(error, "status_code", None)
+    if not (isinstance(error, openai.APIConnectionError) or status == 429 or (status is not None and status >= 500)):
+        return None
+    delay = random.uniform(0, min(REPORT_RETRY_MAX, REPORT_RETRY_BASE * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        return delay
+
+
+class MinuteRateLimiter:
+    """1분에 per_minute만큼 다시 채워지는 token bucket (요청 수, token 수 제한에 사용)"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.available = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        # 한 번에 capacity보다 많이 요청하면 영원히 기다리게 되므로 capacity로 제한
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+
+class ReportEngine:
+    """
+    여러 (title, episode)의 보고서를 asyncio로 동시에 생성한다.
+    API 요청은 concurrency개까지 동시에 보내며, 분당 요청 수(rpm)와 token 수(tpm)를 넘지 않도록 기다린다.
+    429/5xx 오류는 jitter를 둔 지수 backoff로 재시도하고, 응답은 (provider, model, 프롬프트 해시)로 캐시한다.
+    """
+
+    def __init__(self, provider="openai", concurrency=REPORT_CONCURRENCY, rpm=REPORT_RPM, tpm=REPORT_TPM,
+                 max_retries=REPORT_MAX_RETRIES):
+        self.provider = importlib.import_module(PROVIDER_MODULES[provider])
+        self.client = AsyncOpenAI(api_key=self.provider.API_KEY, base_url=self.provider.BASE_URL, max_retries=0)
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.cache = ResponseCache()
+        self.retries = 0
+        self._inflight = {}
+
+    async def _request(self, messages, tokens):
+        """API를 호출해 응답 내용을 반환 (재시도 가능한 오류는 max_retries번까지 다시 요청)"""
+        provider = self.provider
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._request_limiter.acquire()
+                await self._token_limiter.acquire(tokens)
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=provider.MODEL, messages=messages, **provider.COMPLETION_OPTIONS
+                    )
+                    return response
+                except openai.APIError as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt == self.max_retries:
+                        raise
+                    error_name = e.__class__.__name__
+            self.retries += 1
+            log(f"API 오류 ({error_name}), {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def complete(self, prompt):
+        """프롬프트의 응답 (캐시에 있으면 API를 호출하지 않고, 같은 프롬프트를 동시에 요청해도 한 번만 호출)"""
+        provider = self.provider
+        messages = provider.build_messages(prompt)
+        key = prompt_hash(messages, provider.COMPLETION_OPTIONS)
+        content = self.cache.get(provider.PROVIDER, provider.MODEL, key)
+        if content is not None:
+            return content
+        if key in self._inflight:
+            return await self._inflight[key]
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            tokens = count_tokens(provider.SYSTEM_MESSAGE + prompt, provider.MODEL) + \
+                provider.COMPLETION_OPTIONS.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+            response = await self._request(messages, tokens)
+            content = provider.parse_response(response.choices[0].message.content)
+            self.cache.put(provider.PROVIDER, provider.MODEL, key, content, response.usage)
+            future.set_result(content)
+            return content
+        except Exception as e:
+            future.set_exception(e)
+            # 기다리는 요청이 없으면 예외가 처리되지 않았다는 경고가 나오므로 여기서 한 번 꺼내 둔다.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def run_job(self, title, episode):
+        """한 회차의 프롬프트를 만들고 보고서를 저장 (DB 조회와 파일 저장은 thread에서 실행)"""
+        try:
+            prompt = await asyncio.to_thread(self.provider.generate_prompt, title, episode)
+            if not prompt:
+                return title, episode, "skipped", None
+            content = await self.complete(prompt)
+            await asyncio.to_thread(self.provider.save_report, title, episode, content)
+        except Exception as e:
+            return title, episode, "failed", e
+        return title, episode, "done", None
+
+    async def run(self, jobs):
+        """jobs: (title, episode) list. 작업마다 (title, episode, 상태, 오류)를 반환"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._request_limiter = MinuteRateLimiter(self.rpm)
+        self._token_limiter = MinuteRateLimiter(self.tpm)
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(self.run_job(title, episode) for title, episode in jobs))
+        finally:
+            await self.client.close()
+        self.print_summary(results, time.perf_counter() - started)
+        return results
+
+    def print_summary(self, results, elapsed):
+        counts = {}
+        for _, _, status, _ in results:
+            counts[status] = counts.get(status, 0) + 1
+        print(f"\n총 {len(results)}개 보고서 ({elapsed:.1f}초): " +
+              ", ".join(f"{status} {count}" for status, count in counts.items()))
+        print(f"응답 캐시: {self.cache.stats()}, 재시도 {self.retries}회")
+        for title, episode, status, error in results:
+            if status == "failed":
+                print(f"[FAIL] {title} {episode}화 - {error}")
+
+    def close(self):
+        self.cache.close()
+
+
+def generate_reports(jobs, provider="openai", concurrency=REPORT_CONCURRENCY, rpm=REPORT_RPM, tpm=REPORT_TPM):
+    """여러 (title, episode)의 보고서를 동시에 생성"""
+    engine = ReportEngine(provider, concurrency, rpm, tpm)
+    try:
+        return asyncio.run(engine.run(jobs))
+    finally:
+        engine.close()
+
+def main():
+    from batch import load_manifest, parse_episodes
+
+    parser = argparse.ArgumentParser(description="여러 웹툰/회차의 LLM 보고서를 동시에 생성")
+    parser.add_argument("--provider", choices=list(PROVIDER_MODULES), default="openai")
+    parser.add_argument("--manifest", help="작업 목록 JSON 파일 경로 (batch.py와 같은 형식)")
+    parser.add_argument("--title", help="웹툰 제목 (--episodes와 함께 사용)")
+    parser.add_argument("--episodes", help="회차 범위 (예: 150-160 또는 150,152)")
+    parser.add_argument("--concurrency", type=int, default=REPORT_CONCURRENCY, help="동시에 보낼 API 요청 수")
+    parser.add_argument("--rpm", type=int, default=REPORT_RPM, help="분당 요청 수 제한")
+    parser.add_argument("--tpm", type=int, default=REPORT_TPM, help="분당 token 수 제한")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest) if args.manifest else []
+    if args.title and args.episodes:
+        jobs.extend((args.title, episode) for episode in parse_episodes(args.episodes))
+    if not jobs:
+        parser.error("--manifest 또는 --title/--episodes를 지정해야 합니다.")
+
+    log(f"총 {len(jobs)}개 보고서 생성 시작 ({args.provider})")
+    generate_reports(jobs, args.provider, args.concurrency, args.rpm, args.tpm)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPORT_CACHE_PATH = os.getenv('REPORT_CACHE_PATH', 'report_cache.sqlite3')
+
+
+def prompt_hash(messages, options=None):
+    """요청 메시지와 옵션(max_tokens, temperature 등)의 sha256 해시"""
+    payload = json.dumps({"messages": messages, "options": options or {}}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    (provider, model, 프롬프트 해시)를 키로 LLM 응답을 저장하는 디스크 캐시.
+    같은 프롬프트로 다시 요청하면 API를 호출하지 않고 저장된 응답을 사용한다.
+    """
+
+    def __init__(self, path: str = REPORT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_responses (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                content TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (provider, model, prompt_hash)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, provider: str, model: str, key: str):
+        """캐시에 저장된 응답 내용 (없으면 None)"""
+        row = self.conn.execute(
+            "SELECT content FROM report_responses WHERE provider = ? AND model = ? AND prompt_hash = ?",
+            (provider, model, key)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, provider: str, model: str, key: str, content: str, usage=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO report_responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (provider, model, key, content, getattr(usage, 'prompt_tokens', None),
+             getattr(usage, 'completion_tokens', None), time.time())
+        )
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return f"hit {self.hits} / miss {self.misses} (hit rate {hit_rate:.1f}%)"
+
+    def close(self):
+        self.conn.close()
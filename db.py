@@ -0,0 +1,245 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from psycopg2.extensions import connection
+from psycopg2.pool import ThreadedConnectionPool
+
+load_dotenv()
+
+# 전역 변수 설정
+DB_NAME = os.getenv('DB_NAME')
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 8))
+
+SCHEMA_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS webtoon_episodes (
+        id SERIAL PRIMARY KEY,
+        webtoon VARCHAR(255) NOT NULL,
+        episode INT NOT NULL,
+        interest_count INT,
+        like_count INT,
+        rating FLOAT,
+        trend JSONB,  -- 최근 5화의 별점 & 부정 댓글 비율 저장
+        comments JSONB, -- (이전 버전) 댓글 전체를 JSON 형태로 저장, 현재는 webtoon_comments 테이블 사용
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (webtoon, episode)  -- 중복 방지
+    );
+    """,
+    # 댓글 한 개가 한 row인 테이블 (comment_index는 processed 파일의 댓글 순서, 최신순)
+    """
+    CREATE TABLE IF NOT EXISTS webtoon_comments (
+        episode_id INT NOT NULL REFERENCES webtoon_episodes (id) ON DELETE CASCADE,
+        comment_index INT NOT NULL,
+        webtoon VARCHAR(255) NOT NULL,
+        episode INT NOT NULL,
+        nickname TEXT,
+        text TEXT,
+        recomm INT,
+        unrecomm INT,
+        date TIMESTAMPTZ,
+        sentiment_score DOUBLE PRECISION,
+        reader_loyalty VARCHAR(20),
+        PRIMARY KEY (episode_id, comment_index)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS webtoon_comments_webtoon_episode_idx ON webtoon_comments (webtoon, episode);",
+    "CREATE INDEX IF NOT EXISTS webtoon_comments_sentiment_score_idx ON webtoon_comments (sentiment_score);",
+    "CREATE INDEX IF NOT EXISTS webtoon_comments_reader_loyalty_idx ON webtoon_comments (reader_loyalty);",
+]
+
+# webtoon_episodes.comments(JSONB)의 댓글을 webtoon_comments로 옮기는 쿼리 (회차 하나씩 실행)
+BACKFILL_QUERY = """
+    INSERT INTO webtoon_comments (episode_id, comment_index, webtoon, episode, nickname, text, recomm, unrecomm,
+                                  date, sentiment_score, reader_loyalty)
+    SELECT e.id, (c.ordinality - 1)::int, e.webtoon, e.episode,
+           c.value->>'nickname',
+           c.value->>'text',
+           NULLIF(regexp_replace(c.value->>'recomm', '[^0-9]', '', 'g'), '')::int,
+           NULLIF(regexp_replace(c.value->>'unrecomm', '[^0-9]', '', 'g'), '')::int,
+           NULLIF(c.value->>'date', '')::timestamptz,
+           (c.value->>'sentiment_score')::double precision,
+           c.value->>'reader_loyalty'
+    FROM webtoon_episodes e
+    CROSS JOIN LATERAL jsonb_array_elements(e.comments) WITH ORDINALITY AS c(value, ordinality)
+    WHERE e.id = %s
+    ON CONFLICT (episode_id, comment_index) DO NOTHING;
+"""
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+
+class PoolMetrics:
+    """connection을 얻기까지 기다린 시간(wait)과 connection을 사용한 시간(checkout)을 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checkout_total = 0.0
+        self.checkout_max = 0.0
+        self.in_use = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_checkout(self, seconds):
+        with self._lock:
+            self.in_use -= 1
+            self.checkout_total += seconds
+            self.checkout_max = max(self.checkout_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "wait_avg_ms": round(self.wait_total / checkouts * 1000, 2),
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+                "checkout_avg_ms": round(self.checkout_total / checkouts * 1000, 2),
+                "checkout_max_ms": round(self.checkout_max * 1000, 2),
+            }
+
+
+metrics = PoolMetrics()
+
+
+class PooledConnection(connection):
+    """
+    pool의 connection. PREPARE한 statement는 session이 끝날 때까지 남으므로 이름을 connection과 함께 보관한다.
+    (pool이 connection을 닫고 새로 만들면 기록도 함께 사라진다.)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+def bootstrap_schema(conn):
+    """테이블과 index 생성 (pool을 만들 때 process당 한 번만 실행)"""
+    cursor = conn.cursor()
+    for query in SCHEMA_QUERIES:
+        cursor.execute(query)
+    conn.commit()
+    cursor.close()
+
+def backfill_comments(conn, drop_jsonb=False):
+    """
+    comments JSONB에 댓글이 남아 있고 webtoon_comments에는 댓글이 없는 회차를 찾아 댓글을 옮긴다.
+    회차마다 commit하므로 중간에 중단되어도 다시 실행하면 남은 회차부터 이어서 옮긴다 (옮길 회차가 없으면 조회 한 번으로 끝남).
+    drop_jsonb이면 옮긴 회차의 comments JSONB를 비운다.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT e.id, e.webtoon, e.episode FROM webtoon_episodes e
+        WHERE e.comments IS NOT NULL
+          AND jsonb_typeof(e.comments) = 'array'
+          AND jsonb_array_length(e.comments) > 0
+          AND NOT EXISTS (SELECT 1 FROM webtoon_comments c WHERE c.episode_id = e.id)
+        ORDER BY e.id;
+    """)
+    episodes = cursor.fetchall()
+    if episodes:
+        log(f"댓글을 옮길 회차: {len(episodes)}개")
+    for episode_id, webtoon, episode in episodes:
+        cursor.execute(BACKFILL_QUERY, (episode_id,))
+        log(f"{webtoon} {episode}화 댓글 {cursor.rowcount}개 이동")
+        if drop_jsonb:
+            cursor.execute("UPDATE webtoon_episodes SET comments = NULL WHERE id = %s;", (episode_id,))
+        conn.commit()
+    conn.commit()
+    cursor.close()
+    return len(episodes)
+
+def get_pool():
+    """
+    DB_* 환경 변수로 설정한 process 공유 connection pool
+    처음 호출할 때 생성하며, schema를 준비하고 comments JSONB에만 남아 있는 이전 버전 댓글을 webtoon_comments로 옮긴다.
+    """
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            pool = ThreadedConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX,
+                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT,
+                connection_factory=PooledConnection
+            )
+            conn = pool.getconn()
+            try:
+                bootstrap_schema(conn)
+                backfill_comments(conn)
+            finally:
+                pool.putconn(conn)
+            # ThreadedConnectionPool은 connection이 모자라면 바로 오류를 내므로 semaphore로 빈 connection을 기다린다.
+            _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+            _pool = pool
+            atexit.register(close_pool)
+            log(f"DB connection pool 생성 (최대 {DB_POOL_MAX}개)")
+        return _pool
+
+@contextmanager
+def get_connection():
+    """
+    pool에서 connection을 빌려주고 with 블록이 끝나면 반환한다.
+    예외가 나면 rollback하며, commit은 호출하는 쪽에서 한다.
+    """
+    pool = get_pool()
+    started = time.perf_counter()
+    _pool_slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    checked_out = time.perf_counter()
+    metrics.record_wait(checked_out - started)
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+        _pool_slots.release()
+        metrics.record_checkout(time.perf_counter() - checked_out)
+
+def execute_prepared(cursor, name, statement, params):
+    """
+    이름이 name인 prepared statement를 실행한다.
+    statement는 "PREPARE name (...) AS ..." 형태이며, connection(session)마다 처음 한 번만 PREPARE 한다.
+    """
+    prepared = cursor.connection.prepared_statements
+    if name not in prepared:
+        cursor.execute(statement)
+        prepared.add(name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+
+def pool_stats():
+    """connection pool 사용 통계 (checkout 횟수, 평균/최대 대기 시간, 평균/최대 사용 시간)"""
+    return metrics.snapshot()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
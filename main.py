@@ -1,37 +1,99 @@
 from crawler.extract_comments import scrape_recent_episodes, scrape_webtoon_comments
+from crawler.comment_api import scrape_webtoon_comments_api
+from crawler.stream_pipeline import run_streaming_pipeline
 from crawler.transform_comments import transform
 from crawler.update_trend import update_comments_with_trend
 from crawler.load_comments import insert_episode_data
 from create_report.gptapi_report import gpt_report
-from visualize.visualize import visualize 
-from crawler.make_wordcloud import generate_combined_wordcloud
+from visualize.visualize import render_episode
+from visualize import render
+from crawler.episode_context import EpisodeContext
+from stage_manifest import StageManifest, run_stage
 import argparse
 
-def main(title, episode):
-    print(f"웹툰 '{title}'의 에피소드 {episode} 처리 시작")
+def crawl_stage(title, episode, options, context=None):
+    """ 1. 댓글 수집 (pipeline 모드에서는 감성 분석까지 함께 진행) """
+    # batch에서는 웹툰마다 회차 목록을 작업 시작 전에 한 번만 수집
+    if not options.get("episodes_collected"):
+        scrape_recent_episodes(title)
+    if options.get("pipeline"):
+        # context가 있으면 processed 파일은 trend를 추가한 뒤 한 번만 저장
+        data = run_streaming_pipeline(title, episode, options.get("engine", "selenium"), options.get("incremental", False),
+                                      save=context is None)
+        if context is not None:
+            context.processed = data
+    elif options.get("engine") == "api":
+        data = scrape_webtoon_comments_api(title, episode, incremental=options.get("incremental", False))
+    else:
+        data = scrape_webtoon_comments(title, episode, stream=options.get("stream", False),
+                                       incremental=options.get("incremental", False))
+    if context is not None and data is not None:
+        context.raw = data
+
+def transform_stage(title, episode, options, context=None):
+    """ 2. 댓글 전처리 """
+    if context is None:
+        if not options.get("pipeline"):
+            transform(title, episode, workers=options.get("workers", 1))
+        update_comments_with_trend(title, episode)
+        return
 
-    # 1. 댓글 수집
-    print("댓글 수집 중...")
-    scrape_recent_episodes(title)
-    scrape_webtoon_comments(title, episode)
+    if not options.get("pipeline"):
+        context.processed = transform(title, episode, workers=options.get("workers", 1), data=context.raw, save=False)
+    context.processed = update_comments_with_trend(title, episode, context.processed)
 
-    # 2. 댓글 전처리
-    print("댓글 전처리 중...")
-    transform(title, episode)
-    update_comments_with_trend(title, episode)
+def load_stage(title, episode, options, context=None):
+    """ 3. DB 적재 """
+    if context is None:
+        insert_episode_data(title, episode)
+        return
+    context.created_at = insert_episode_data(title, episode, context.processed)
 
-    # 3. DB 적재
-    print("DB 적재 중...")
-    insert_episode_data(title, episode)
+def visualize_stage(title, episode, options, context=None):
+    """ 4. 시각화 """
+    data = context.processed if context is not None else None
+    # trend, 감정 파이 차트, 워드 클라우드를 render pool에서 동시에 그림
+    render_episode(title, episode, data)
 
-    # 4. 시각화
-    print("시각화 중...")
-    visualize(title, episode)
-    generate_combined_wordcloud(title, episode)
+def report_stage(title, episode, options, context=None):
+    """ 5. 리포트 생성 """
+    if context is None:
+        gpt_report(title, episode)
+        return
+    gpt_report(title, episode, context.processed, context.created_at)
 
-    # 5. 리포트 생성
-    print("리포트 생성 중...")
-    gpt_report(title, episode)
+# (stage 이름, 진행 메시지, 실행 함수, 작업 종류)
+# 작업 종류가 "io"인 stage는 네트워크/DB 대기가 대부분이고, "cpu"인 stage는 추론/렌더링 연산이 대부분이다.
+STAGES = [
+    ("crawl", "댓글 수집 중...", crawl_stage, "io"),
+    ("transform", "댓글 전처리 중...", transform_stage, "cpu"),
+    ("load", "DB 적재 중...", load_stage, "io"),
+    ("visualize", "시각화 중...", visualize_stage, "cpu"),
+    ("report", "리포트 생성 중...", report_stage, "io"),
+]
+
+def skip_options(name, options):
+    """stage를 건너뛴 뒤 다음 stage에 넘길 options (수집을 건너뛰면 pipeline의 감성 분석도 없었으므로 전처리에서 전체 변환)"""
+    if name == "crawl" and options.get("pipeline"):
+        return {**options, "pipeline": False}
+    return options
+
+def main(title, episode, workers=1, engine="selenium", stream=False, incremental=False, pipeline=False, force=()):
+    print(f"웹툰 '{title}'의 에피소드 {episode} 처리 시작")
+
+    options = {"workers": workers, "engine": engine, "stream": stream, "incremental": incremental, "pipeline": pipeline}
+    manifest = StageManifest()
+    # 댓글과 회차 정보는 stage 사이에서 메모리로 전달
+    context = EpisodeContext(title, episode)
+    try:
+        for name, message, stage, kind in STAGES:
+            print(message)
+            if not run_stage(manifest, name, stage, title, episode, options, force, context=context):
+                print(f"입력 변경 없음, {name} 단계 건너뜀")
+                options = skip_options(name, options)
+    finally:
+        # 시각화 단계에서 만든 렌더링 process pool 종료
+        render.shutdown()
 
     print(f"웹툰 '{title}'의 에피소드 {episode} 처리 완료.")
 
@@ -39,7 +101,13 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="웹툰 댓글 수집 및 분석 파이프라인")
     parser.add_argument("--title", required=True, help="웹툰 제목")
     parser.add_argument("--episode", type=int, required=True, help="에피소드 번호")
-    
+    parser.add_argument("--workers", type=int, default=1, help="감성 분석에 사용할 프로세스 수")
+    parser.add_argument("--engine", choices=["selenium", "api"], default="selenium", help="댓글 수집 방식")
+    parser.add_argument("--stream", action="store_true", help="페이지마다 댓글을 추출하여 브라우저 메모리를 일정하게 유지 (selenium)")
+    parser.add_argument("--incremental", action="store_true", help="마지막 수집 이후 새로 달린 댓글만 수집하여 기존 파일에 병합")
+    parser.add_argument("--pipeline", action="store_true", help="댓글 수집과 감성 분석을 동시에 진행")
+    parser.add_argument("--force", action="append", default=[], choices=[name for name, *_ in STAGES] + ["all"],
+                        help="입력이 바뀌지 않았어도 다시 실행할 stage (여러 번 지정 가능, all은 전체)")
     
     args = parser.parse_args()
-    main(args.title, args.episode)
\ No newline at end of file
+    main(args.title, args.episode, args.workers, args.engine, args.stream, args.incremental, args.pipeline, args.force)
\ No newline at end of file
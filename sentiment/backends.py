@@ -0,0 +1,188 @@
+import os
+import json
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH')
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'pytorch')
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+REFERENCE_BACKEND = 'pytorch'
+
+
+def quantized_model_path(model_path: str):
+    """int8 동적 양자화 모델이 저장되는 경로 (LOCAL_MODEL_PATH 옆)"""
+    return f"{os.path.normpath(model_path)}_int8.pt"
+
+def onnx_model_path(model_path: str):
+    """ONNX로 export된 모델이 저장되는 경로 (LOCAL_MODEL_PATH 옆)"""
+    return os.path.join(f"{os.path.normpath(model_path)}_onnx", "model.onnx")
+
+def export_quantized_model(model_path: str):
+    """
+    model_path의 PyTorch 모델을 Linear layer 기준 int8 동적 양자화하여 저장한다.
+
+    :param model_path: Path to the directory containing the pre-trained model.
+    :type model_path: str
+    :return: Path of the saved quantized model.
+    :rtype: str
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    save_path = quantized_model_path(model_path)
+    torch.save(quantized, save_path)
+    return save_path
+
+def export_onnx_model(model_path: str, opset_version: int = 14):
+    """
+    model_path의 PyTorch 모델을 batch, sequence 길이가 가변인 ONNX 그래프로 export한다.
+
+    :param model_path: Path to the directory containing the pre-trained model.
+    :type model_path: str
+    :param opset_version: ONNX opset version used for the export.
+    :type opset_version: int
+    :return: Path of the saved ONNX model.
+    :rtype: str
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True)
+    model.config.return_dict = False
+    model.eval()
+
+    sample = tokenizer("웹툰 댓글 감성 분석", return_tensors='pt')
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    save_path = onnx_model_path(model_path)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dict(sample),),
+            save_path,
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version
+        )
+    return save_path
+
+
+class OnnxSentimentPipeline:
+    """
+    ONNX Runtime session을 TextClassificationPipeline과 같은 방식으로 호출할 수 있도록 감싼 클래스.
+    pipeline(text)는 [{'label', 'score'}], pipeline(texts)는 text마다 {'label', 'score'}의 list를 반환한다.
+    """
+
+    def __init__(self, model_path: str, num_threads: int = None):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        self.id2label = AutoConfig.from_pretrained(model_path, local_files_only=True).id2label
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_model_path(model_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def _predict(self, texts: list):
+        encoded = self.tokenizer(texts, padding=True, return_tensors='np')
+        feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        logits = self.session.run(['logits'], feed)[0]
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+        labels = probs.argmax(axis=-1)
+        return [{'label': self.id2label[int(label)], 'score': float(prob[label])} for label, prob in zip(labels, probs)]
+
+    def __call__(self, inputs, batch_size: int = None):
+        if isinstance(inputs, str):
+            return self._predict([inputs])
+        inputs = list(inputs)
+        batch_size = batch_size or len(inputs) or 1
+        preds = []
+        for start in range(0, len(inputs), batch_size):
+            preds.extend(self._predict(inputs[start:start + batch_size]))
+        return preds
+
+
+def load_quantized_model(model_path: str):
+    """export_quantized_model로 저장된 int8 모델 로드"""
+    import torch
+    return torch.load(quantized_model_path(model_path), weights_only=False)
+
+def check_parity(model_path: str, texts: list, backends: tuple = BACKENDS):
+    """
+    각 backend의 sentiment_score가 기준 backend(pytorch)와 얼마나 차이나는지 측정한다.
+
+    :param model_path: Path to the directory containing the pre-trained model.
+    :type model_path: str
+    :param texts: Sample texts used for the comparison.
+    :type texts: list[str]
+    :param backends: Backends to compare against the reference backend.
+    :type backends: tuple[str]
+    :return: Per-backend drift statistics (max/mean absolute difference,
+        number of exact matches and of polarity flips).
+    :rtype: dict
+    """
+    from sentiment.sentiment_predictor import get_sentiment_classifier, get_sentiment_scores
+
+    reference = get_sentiment_scores(texts, get_sentiment_classifier(model_path, REFERENCE_BACKEND))
+    report = {}
+    for backend in backends:
+        if backend == REFERENCE_BACKEND:
+            continue
+        scores = get_sentiment_scores(texts, get_sentiment_classifier(model_path, backend))
+        diffs = np.abs(np.array(scores) - np.array(reference))
+        report[backend] = {
+            "samples": len(texts),
+            "max_abs_diff": round(float(diffs.max()), 4) if len(texts) else 0.0,
+            "mean_abs_diff": round(float(diffs.mean()), 4) if len(texts) else 0.0,
+            "exact_match": int((diffs == 0).sum()),
+            "polarity_flip": sum(1 for a, b in zip(scores, reference) if (a >= 0) != (b >= 0))
+        }
+    return report
+
+def load_sample_texts(sample_file: str, limit: int):
+    """댓글 JSON 파일(raw/processed)에서 parity 검사용 text를 가져온다."""
+    with open(sample_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [comment['text'] for comment in data['comments'][:limit]]
+
+def main():
+    parser = argparse.ArgumentParser(description="감성 분석 모델 backend export 및 parity 검사")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='양자화/ONNX 모델 생성')
+    export_parser.add_argument('--backend', choices=('quantized', 'onnx'), required=True)
+
+    parity_parser = subparsers.add_parser('parity', help='backend별 감성 점수 차이 측정')
+    parity_parser.add_argument('--sample', required=True, help='댓글 JSON 파일 경로')
+    parity_parser.add_argument('--limit', type=int, default=1000, help='검사에 사용할 댓글 수')
+    parity_parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        if args.backend == 'quantized':
+            save_path = export_quantized_model(LOCAL_MODEL_PATH)
+        else:
+            save_path = export_onnx_model(LOCAL_MODEL_PATH)
+        print(f"{args.backend} 모델이 {save_path}에 저장되었습니다.")
+    else:
+        texts = load_sample_texts(args.sample, args.limit)
+        report = check_parity(LOCAL_MODEL_PATH, texts, tuple(args.backends))
+        print(json.dumps(report, ensure_ascii=False, indent=4))
+
+if __name__ == '__main__':
+    main()
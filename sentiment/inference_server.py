@@ -0,0 +1,136 @@
+import os
+import json
+import socket
+import argparse
+import threading
+import socketserver
+from dotenv import load_dotenv
+from sentiment.backends import SENTIMENT_BACKEND
+from sentiment.score_cache import get_model_identity
+
+load_dotenv()
+
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH')
+SENTIMENT_SOCKET_PATH = os.getenv('SENTIMENT_SOCKET_PATH', '/tmp/webtoon_sentiment.sock')
+
+# 한 번의 요청으로 보내는 최대 text 수
+REQUEST_CHUNK_SIZE = 4096
+# server에 연결하기까지 기다리는 최대 시간 (초), 넘으면 process 내 모델 로드로 대체
+# 연결된 뒤에는 다른 요청의 추론이 끝나기를 기다리는 시간이 포함되므로 응답은 시간 제한 없이 기다린다.
+SENTIMENT_SERVER_CONNECT_TIMEOUT = float(os.getenv('SENTIMENT_SERVER_CONNECT_TIMEOUT', 5))
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+
+class SentimentRequestHandler(socketserver.StreamRequestHandler):
+    """
+    한 줄에 JSON 하나씩 요청을 받아 한 줄의 JSON으로 응답한다.
+    요청: {"model": <model identity>, "texts": [...], "batch_size": n}
+    응답: {"scores": [...]} 또는 {"error": "..."}
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.score(request)
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+
+class SentimentInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """분류기를 메모리에 올려둔 채로 Unix socket으로 감성 점수 요청을 처리하는 서버"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model_path: str, backend: str):
+        from sentiment.sentiment_predictor import get_sentiment_classifier
+
+        self.model = get_model_identity(model_path, backend)
+        self.classifier = get_sentiment_classifier(model_path, backend)
+        # 모델은 하나이므로 추론은 한 번에 하나의 요청만 수행
+        self.lock = threading.Lock()
+        super().__init__(socket_path, SentimentRequestHandler)
+
+    def score(self, request: dict):
+        from sentiment.sentiment_predictor import get_sentiment_scores
+
+        if request.get("model") != self.model:
+            return {"error": f"model mismatch: server={self.model}"}
+        with self.lock:
+            scores = get_sentiment_scores(request["texts"], self.classifier, request.get("batch_size", 32),
+                                          show_progress=False)
+        return {"scores": scores}
+
+
+def request_scores(texts: list, model: str, batch_size: int, socket_path: str = SENTIMENT_SOCKET_PATH):
+    """
+    실행 중인 inference server에 감성 점수 계산을 요청한다.
+    server가 없거나, 다른 모델을 사용 중이거나, SENTIMENT_SERVER_CONNECT_TIMEOUT 안에 연결되지 않으면 None을 반환하므로
+    호출하는 쪽에서 process 내 모델 로드로 대체할 수 있다.
+    일부 chunk를 처리한 뒤 요청이 실패하면 그때까지 받은 앞부분의 점수만 반환하므로, 호출하는 쪽은 나머지만 계산하면 된다.
+
+    :param texts: The input texts whose sentiment is to be analyzed.
+    :type texts: list[str]
+    :param model: Model identity the scores must come from.
+    :type model: str
+    :param batch_size: Number of texts passed to the model at once.
+    :type batch_size: int
+    :param socket_path: Path of the server's Unix socket.
+    :type socket_path: str
+    :return: The scores for texts (or for a prefix of texts if the server
+        failed midway) in the same order, or None.
+    :rtype: list[float] | None
+    """
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+
+    scores = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(SENTIMENT_SERVER_CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.settimeout(None)
+            stream = sock.makefile('rwb')
+            for start in range(0, len(texts), REQUEST_CHUNK_SIZE):
+                request = {"model": model, "texts": texts[start:start + REQUEST_CHUNK_SIZE], "batch_size": batch_size}
+                stream.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+                if "error" in response:
+                    log(f"inference server 요청 실패: {response['error']}")
+                    break
+                scores.extend(response["scores"])
+    except socket.timeout:
+        log(f"inference server 연결 시간 초과 ({SENTIMENT_SERVER_CONNECT_TIMEOUT}초)")
+    except (OSError, ValueError) as e:
+        log(f"inference server 연결 실패: {e}")
+    return scores or None
+
+def main():
+    parser = argparse.ArgumentParser(description="감성 분석 inference server")
+    parser.add_argument('--socket', default=SENTIMENT_SOCKET_PATH, help='Unix socket 경로')
+    parser.add_argument('--backend', default=SENTIMENT_BACKEND, help='추론 backend (pytorch, quantized, onnx)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+
+    log(f"Sentiment Classifier 로딩 중 ({args.backend})")
+    server = SentimentInferenceServer(args.socket, LOCAL_MODEL_PATH, args.backend)
+    log(f"inference server 대기 중: {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+        log("inference server 종료")
+
+if __name__ == '__main__':
+    main()
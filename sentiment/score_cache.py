@@ -0,0 +1,129 @@
+import os
+import re
+import sqlite3
+import hashlib
+import unicodedata
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SENTIMENT_CACHE_PATH = os.getenv('SENTIMENT_CACHE_PATH', 'sentiment_cache.sqlite3')
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv('SENTIMENT_CACHE_MAX_ENTRIES', 1_000_000))
+
+# SQLite 한 번의 쿼리에 넣을 수 있는 파라미터 수 제한을 피하기 위한 조회 단위
+_LOOKUP_CHUNK_SIZE = 500
+
+
+def normalize_text(text: str):
+    """
+    캐시 키 생성을 위해 text를 정규화한다.
+    유니코드 NFC 정규화 후 앞뒤 공백을 제거하고, 연속된 공백을 하나로 합친다.
+    """
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def text_hash(text: str):
+    """정규화된 text의 sha256 해시"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+def get_model_identity(model_path: str, backend: str = 'pytorch'):
+    """
+    model_path에 있는 모델을 식별하는 문자열을 만든다.
+    모델 디렉토리 이름과 config.json 내용의 해시, 추론 backend를 조합하므로,
+    같은 경로에 다른 모델을 덮어쓰거나 backend를 바꾸면 다른 identity가 된다.
+    """
+    digest = hashlib.sha256()
+    config_path = os.path.join(model_path, 'config.json')
+    if os.path.isfile(config_path):
+        with open(config_path, 'rb') as f:
+            digest.update(f.read())
+    name = os.path.basename(os.path.normpath(model_path))
+    return f"{name}:{digest.hexdigest()[:16]}:{backend}"
+
+
+class SentimentScoreCache:
+    """
+    (모델 identity, 정규화된 text 해시)를 키로 감성 점수를 저장하는 디스크 캐시.
+    SQLite 파일 하나에 저장되며, 항목 수가 max_entries를 넘으면
+    가장 오래 사용되지 않은 항목부터 제거한다.
+    """
+
+    def __init__(self, path: str = SENTIMENT_CACHE_PATH, max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_scores (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_scores_last_used ON sentiment_scores (last_used)")
+        self.conn.commit()
+        self._clock = self.conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM sentiment_scores").fetchone()[0]
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, model: str, hashes: list):
+        """hashes 중 캐시에 있는 항목을 {hash: score} 형태로 반환"""
+        found = {}
+        hashes = list(set(hashes))
+        for start in range(0, len(hashes), _LOOKUP_CHUNK_SIZE):
+            chunk = hashes[start:start + _LOOKUP_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT text_hash, score FROM sentiment_scores WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *chunk]
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = self._tick()
+            self.conn.executemany(
+                "UPDATE sentiment_scores SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, model, h) for h in found]
+            )
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, scores: dict):
+        """{hash: score}를 캐시에 저장하고 크기 제한을 넘으면 오래된 항목을 제거"""
+        if not scores:
+            return
+        now = self._tick()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sentiment_scores (model, text_hash, score, last_used) VALUES (?, ?, ?, ?)",
+            [(model, h, score, now) for h, score in scores.items()]
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM sentiment_scores").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute("""
+                DELETE FROM sentiment_scores WHERE rowid IN (
+                    SELECT rowid FROM sentiment_scores ORDER BY last_used LIMIT ?
+                )
+            """, (overflow,))
+
+    def stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return f"hit {self.hits} / miss {self.misses} (hit rate {hit_rate:.1f}%)"
+
+    def close(self):
+        self.conn.close()
@@ -1,56 +1,283 @@
 import sys
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import pandas as pd
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
 import argparse
 from dotenv import load_dotenv
 from tqdm import tqdm
+from sentiment.score_cache import SentimentScoreCache, get_model_identity, text_hash
+from sentiment.backends import SENTIMENT_BACKEND, OnnxSentimentPipeline, load_quantized_model
+from sentiment.inference_server import request_scores
 
 load_dotenv()
 
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 32))
+SENTIMENT_CHUNK_SIZE = int(os.getenv('SENTIMENT_CHUNK_SIZE', 512))
 
-def get_sentiment_score(text: str, pipeline: TextClassificationPipeline):
+# process pool worker마다 한 번만 로드되는 분류기
+_worker_classifier = None
+# True이면 score_texts가 로드한 분류기를 _worker_classifier에 두고 다음 호출에서 재사용 (batch CPU pool worker)
+_reuse_classifier = False
+
+
+def _to_sentiment_score(pred: dict):
+    """
+    pipeline의 예측 결과(label, score)를 -1 ~ 1 범위의 감성 점수로 변환한다.
+    """
+    return round((int(pred['label']) * 2 - 1) * pred['score'], 2)
+
+def get_sentiment_score(text: str, pipeline: 'TextClassificationPipeline', cache: SentimentScoreCache = None):
     """
     주어진 text를 local model으로 감성 점수를 평가한다.
     1에 가까울수록 positive, -1에 가까울수록 negative 감성을 의미한다.
+    cache가 주어지면 캐시된 점수를 먼저 확인하고, 없을 때만 추론한다.
 
     :param text: The input text whose sentiment is to be analyzed.
     :type text: str
     :param pipeline: The sentiment classifier pipeline.
-    :type pipeline: TextClassificationPipeline
+    :type pipeline: 'TextClassificationPipeline'
+    :param cache: Optional persistent score cache.
+    :type cache: SentimentScoreCache
     :return: The computed sentiment score. Positive score indicates
         positive sentiment, while a negative score indicates negative.
     :rtype: float
     """
+    if cache is not None:
+        model = get_model_identity(pipeline.model_path, pipeline.backend)
+        key = text_hash(text)
+        cached = cache.get_many(model, [key])
+        if key in cached:
+            return cached[key]
+
     pred = pipeline(text)
     pred = pred[0]
-    return round((int(pred['label']) * 2 - 1) * pred['score'], 2)
+    score = _to_sentiment_score(pred)
+
+    if cache is not None:
+        cache.put_many(model, {key: score})
+    return score
+
+def get_sentiment_scores(texts: list, pipeline: 'TextClassificationPipeline', batch_size: int = SENTIMENT_BATCH_SIZE,
+                         show_progress: bool = True):
+    """
+    여러 text의 감성 점수를 batch 단위로 한 번에 평가한다.
+    text들을 token 길이 순으로 정렬해 비슷한 길이끼리 batch를 구성하므로,
+    각 batch는 그 안에서 가장 긴 text 길이까지만 padding 된다.
+    결과는 입력 순서대로 반환되며 get_sentiment_score와 같은 값을 갖는다.
+
+    :param texts: The input texts whose sentiment is to be analyzed.
+    :type texts: list[str]
+    :param pipeline: The sentiment classifier pipeline.
+    :type pipeline: 'TextClassificationPipeline'
+    :param batch_size: Number of texts passed to the model at once.
+    :type batch_size: int
+    :param show_progress: Whether to display a tqdm progress bar.
+    :type show_progress: bool
+    :return: The computed sentiment scores, in the same order as texts.
+    :rtype: list[float]
+    """
+    if not texts:
+        return []
+
+    # token 길이 기준으로 정렬하여 길이가 비슷한 text끼리 같은 batch에 배치
+    lengths = [len(ids) for ids in pipeline.tokenizer(list(texts))['input_ids']]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    scores = [None] * len(texts)
+    for start in tqdm(range(0, len(order), batch_size), disable=not show_progress):
+        bucket = order[start:start + batch_size]
+        preds = pipeline([texts[i] for i in bucket], batch_size=len(bucket))
+        for i, pred in zip(bucket, preds):
+            scores[i] = _to_sentiment_score(pred)
+    return scores
+
+def _init_worker(model_path: str, num_threads: int, backend: str):
+    """process pool worker 초기화: torch thread 수를 고정하고 분류기를 한 번 로드한다."""
+    global _worker_classifier
+    import torch
+    torch.set_num_threads(num_threads)
+    _worker_classifier = get_sentiment_classifier(model_path, backend, num_threads)
+
+def init_classifier_worker(num_threads: int):
+    """
+    batch CPU pool worker 초기화: worker끼리 CPU core를 나눠 쓰도록 torch thread 수를 고정하고,
+    처음 필요할 때 로드한 분류기를 worker가 끝날 때까지 재사용한다. (시각화만 하는 worker는 모델을 로드하지 않는다.)
+    """
+    global _reuse_classifier
+    import torch
+    torch.set_num_threads(num_threads)
+    _reuse_classifier = True
+
+def get_worker_classifier(model_path: str, backend: str = SENTIMENT_BACKEND):
+    """worker에 로드된 분류기 (없거나 model_path, backend가 다르면 새로 로드)"""
+    global _worker_classifier
+    if _worker_classifier is None or (_worker_classifier.model_path, _worker_classifier.backend) != (model_path, backend):
+        _worker_classifier = get_sentiment_classifier(model_path, backend)
+    return _worker_classifier
 
-def get_sentiment_classifier(model_path: str):
+def _score_chunk(texts: list, batch_size: int):
+    return get_sentiment_scores(texts, _worker_classifier, batch_size, show_progress=False)
+
+def get_sentiment_scores_parallel(texts: list, model_path: str, workers: int, batch_size: int = SENTIMENT_BATCH_SIZE,
+                                  chunk_size: int = SENTIMENT_CHUNK_SIZE, backend: str = SENTIMENT_BACKEND):
+    """
+    여러 process에서 감성 점수를 계산한다.
+    각 worker는 get_sentiment_classifier로 모델을 한 번만 로드하며,
+    CPU core를 나눠 쓰도록 worker당 torch thread 수를 cpu_count // workers로 고정한다.
+    text들은 chunk_size 단위로 나뉘어 worker들에 분배되고, 결과는 입력 순서대로 합쳐진다.
+
+    :param texts: The input texts whose sentiment is to be analyzed.
+    :type texts: list[str]
+    :param model_path: Path to the directory containing the pretrained model.
+    :type model_path: str
+    :param workers: Number of worker processes.
+    :type workers: int
+    :param batch_size: Number of texts passed to the model at once.
+    :type batch_size: int
+    :param chunk_size: Number of texts sent to a worker at once.
+    :type chunk_size: int
+    :param backend: Inference backend ('pytorch', 'quantized' or 'onnx').
+    :type backend: str
+    :return: The computed sentiment scores, in the same order as texts.
+    :rtype: list[float]
+    """
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+
+    scores = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(model_path, num_threads, backend)) as executor:
+        results = executor.map(_score_chunk, chunks, [batch_size] * len(chunks))
+        for chunk_scores in tqdm(results, total=len(chunks)):
+            scores.extend(chunk_scores)
+    return scores
+
+def score_texts(texts: list, model_path: str, cache: SentimentScoreCache = None, batch_size: int = SENTIMENT_BATCH_SIZE,
+                workers: int = 1, backend: str = SENTIMENT_BACKEND, classifier: 'TextClassificationPipeline' = None):
+    """
+    여러 text의 감성 점수를 계산한다.
+    정규화 후 동일한 text는 한 번만 평가하고, cache에 있는 점수는 재사용한다.
+    추론이 필요한 text가 있을 때만 model_path에서 모델을 로드한다.
+
+    :param texts: The input texts whose sentiment is to be analyzed.
+    :type texts: list[str]
+    :param model_path: Path to the directory containing the pretrained model.
+    :type model_path: str
+    :param cache: Optional persistent score cache.
+    :type cache: SentimentScoreCache
+    :param batch_size: Number of texts passed to the model at once.
+    :type batch_size: int
+    :param workers: Number of worker processes. 1 scores in the current process.
+    :type workers: int
+    :param backend: Inference backend ('pytorch', 'quantized' or 'onnx').
+    :type backend: str
+    :param classifier: Already loaded classifier to reuse instead of loading
+        one from model_path. Must match model_path and backend.
+    :type classifier: TextClassificationPipeline
+    :return: The computed sentiment scores, in the same order as texts.
+    :rtype: list[float]
+    """
+    model = get_model_identity(model_path, backend)
+    hashes = [text_hash(text) for text in texts]
+
+    # 같은 text는 첫 번째 것만 평가
+    unique_texts = {}
+    for key, text in zip(hashes, texts):
+        unique_texts.setdefault(key, text)
+
+    known = cache.get_many(model, list(unique_texts)) if cache is not None else {}
+    missing = [key for key in unique_texts if key not in known]
+
+    if missing:
+        missing_texts = [unique_texts[key] for key in missing]
+        # inference server가 실행 중이면 모델 로드 없이 server에 요청 (도중에 실패하면 받은 점수 이후만 직접 계산)
+        missing_scores = request_scores(missing_texts, model, batch_size) or []
+        rest_texts = missing_texts[len(missing_scores):]
+        if rest_texts and workers > 1 and len(rest_texts) > SENTIMENT_CHUNK_SIZE:
+            missing_scores += get_sentiment_scores_parallel(rest_texts, model_path, workers, batch_size, backend=backend)
+        elif rest_texts:
+            if classifier is None and _reuse_classifier:
+                classifier = get_worker_classifier(model_path, backend)
+            elif classifier is None:
+                classifier = get_sentiment_classifier(model_path, backend)
+            missing_scores += get_sentiment_scores(rest_texts, classifier, batch_size)
+        new_scores = dict(zip(missing, missing_scores))
+        if cache is not None:
+            cache.put_many(model, new_scores)
+        known.update(new_scores)
+
+    return [known[key] for key in hashes]
+
+def get_sentiment_classifier(model_path: str, backend: str = SENTIMENT_BACKEND, num_threads: int = None):
     """
     사전 학습된 분류기 모델을 model_path에서 가져온다.
+    backend에 따라 full-precision PyTorch 모델('pytorch'), int8 동적 양자화 모델('quantized'),
+    ONNX Runtime session('onnx') 중 하나를 사용한다.
+    'quantized'와 'onnx'는 `python -m sentiment.backends export`로 미리 생성한 모델이 필요하다.
 
     :param model_path: Path to the directory containing the pre-trained model
         and tokenizer files.
         Type: str
-    :return: TextClassificationPipeline object initialized with the specified
-        pre-trained model and tokenizer.
+    :param backend: Inference backend ('pytorch', 'quantized' or 'onnx').
+        Type: str
+    :param num_threads: Number of intra-op threads for the ONNX Runtime session.
+        Type: int
+    :return: TextClassificationPipeline (or a compatible callable) initialized
+        with the specified pre-trained model and tokenizer.
         Type: TextClassificationPipeline
     """
-    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True)
-    return TextClassificationPipeline(tokenizer=tokenizer, model=model)
+    # transformers import는 시간이 오래 걸리므로 모델이 실제로 필요할 때만 수행
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
+
+    if backend == 'onnx':
+        pipeline = OnnxSentimentPipeline(model_path, num_threads)
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        if backend == 'quantized':
+            model = load_quantized_model(model_path)
+        elif backend == 'pytorch':
+            model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True)
+        else:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+        pipeline = TextClassificationPipeline(tokenizer=tokenizer, model=model)
+    # 캐시 키 생성에 사용
+    pipeline.model_path = model_path
+    pipeline.backend = backend
+    return pipeline
+
+def to_typed_frame(comment_df: pd.DataFrame):
+    """
+    댓글 DataFrame의 column을 분석에 맞는 타입으로 변환한다.
+
+    :param comment_df: A DataFrame with comment fields and a 'label' column.
+    :type comment_df: pandas.DataFrame
+    :return: A copy of the DataFrame with typed columns.
+    :rtype: pandas.DataFrame
+    """
+    typed_df = comment_df.copy()
+    typed_df['label'] = typed_df['label'].astype('float32')
+    for column in ('recomm', 'unrecomm'):
+        if column in typed_df:
+            typed_df[column] = pd.to_numeric(typed_df[column].astype(str).str.replace(',', ''), errors='coerce') \
+                .fillna(0).astype('int32')
+    if 'date' in typed_df:
+        typed_df['date'] = pd.to_datetime(typed_df['date'], format='%Y-%m-%dT%H:%M:%S%z', errors='coerce')
+    if 'reader_loyalty' in typed_df:
+        typed_df['reader_loyalty'] = typed_df['reader_loyalty'].astype('category')
+    return typed_df
 
 def set_sentiment_column(infile: str, outfile: str, model_path: str):
     """
     JSON 파일 내부의 comments 필드를 DataFrame으로 전환한다.
     DataFrame 내에 'label'이라는 column을 추가하고, 해당 column에 감성 점수를 넣는다.
     이후, DataFrame을 CSV 파일로 저장한다.
+    outfile이 .parquet으로 끝나면 column 타입(label float32, recomm/unrecomm int32, date timestamp)을 지정해 Parquet으로 저장한다.
 
     :param infile: Path to the input JSON file containing comments.
     :type infile: str
-    :param outfile: Path to save the resulting output CSV file.
+    :param outfile: Path to save the resulting output CSV (or Parquet) file.
     :type outfile: str
     :param model_path: Path to the directory containing the pretrained model.
     :type model_path: str
@@ -60,9 +287,6 @@ def set_sentiment_column(infile: str, outfile: str, model_path: str):
     :raises FileNotFoundError: If the input file does not exist.
     """
 
-    # 사전 학습된 모델과 토크나이저 로드
-    sentiment_classifier = get_sentiment_classifier(model_path)
-
     if os.path.exists(outfile):
         print("File already exists. Please choose another name.", file=sys.stderr)
         raise FileExistsError
@@ -75,10 +299,16 @@ def set_sentiment_column(infile: str, outfile: str, model_path: str):
 
     # DataFrame 생성 후 'label' 열 추가
     comment_df = pd.DataFrame(comments_json['comments'])
-    # apply를 사용해 각 텍스트에 `get_sentiment` 호출
-    comment_df['label'] = comment_df['text'].progress_apply(lambda text: get_sentiment_score(text, sentiment_classifier))
+    # 캐시 확인 후 batch 단위로 감성 점수 계산
+    cache = SentimentScoreCache()
+    comment_df['label'] = score_texts(comment_df['text'].tolist(), model_path, cache)
+    print(f"Sentiment cache: {cache.stats()}")
+    cache.close()
     # 결과 저장
-    comment_df.to_csv(outfile, index=False)
+    if outfile.endswith('.parquet'):
+        to_typed_frame(comment_df).to_parquet(outfile, index=False)
+    else:
+        comment_df.to_csv(outfile, index=False)
 
     return comment_df
 
@@ -86,7 +316,7 @@ def main():
     tqdm.pandas()
     parser = argparse.ArgumentParser()
     parser.add_argument('--infile', required=True, help='Input JSON file with comments')
-    parser.add_argument('--outfile', required=True, help='Output CSV file path')
+    parser.add_argument('--outfile', required=True, help='Output CSV file path (.parquet for typed Parquet output)')
     args = parser.parse_args()
     infile = args.infile
     outfile = args.outfile
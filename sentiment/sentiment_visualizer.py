@@ -35,8 +35,13 @@ def display_total_sentiment_pie_chart(data:pd.DataFrame, threshold:float=0.6):
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('--csvfile', required=True, help='Input CSV file path')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--csvfile', help='Input CSV file path')
+    group.add_argument('--parquetfile', help='Input Parquet file path (only the label column is read)')
     parser.add_argument('--threshold', type=float, default=0.6, help='Threshold for positive/negative classification')
     args = parser.parse_args()
-    df = pd.read_csv(args.csvfile)
+    if args.parquetfile:
+        df = pd.read_parquet(args.parquetfile, columns=['label'])
+    else:
+        df = pd.read_csv(args.csvfile)
     display_total_sentiment_pie_chart(df, args.threshold)
\ No newline at end of file
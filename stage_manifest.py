@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sentiment.backends import SENTIMENT_BACKEND
+from sentiment.score_cache import get_model_identity
+from crawler.comment_store import raw_comment_path, processed_comment_path
+from crawler.comment_parquet import parquet_enabled, get_parquet_path
+from crawler.episode_summary import summary_path
+from crawler.update_trend import TREND_WINDOW
+
+load_dotenv()
+
+# 전역 변수 설정
+STAGE_MANIFEST_FILE = os.getenv('STAGE_MANIFEST_FILE', 'stage_manifest.json')
+# 수집 결과를 재사용할 수 있는 최대 시간 (설정하지 않으면 --force crawl 전까지 마지막 수집 결과를 재사용)
+CRAWL_MAX_AGE_HOURS = float(os.getenv('CRAWL_MAX_AGE_HOURS')) if os.getenv('CRAWL_MAX_AGE_HOURS') else None
+
+EPISODE_DATA_DIR = os.getenv('EPISODE_DATA_DIR')
+VISUALIZED_IMAGE_DIR = os.getenv('VISUALIZED_IMAGE_DIR')
+WORDCLOUD_OUTPUT_DIR = os.getenv('WORDCLOUD_OUTPUT_DIR')
+REPORTS_DIR = os.getenv('REPORTS_DIR')
+PROMPT_FILE = os.getenv('PROMPT_FILE_PATH')
+STOPWORDS_FILE = os.getenv('STOPWORDS_FILE')
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH')
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def raw_file(title, episode):
+    return raw_comment_path(title, episode)
+
+def processed_file(title, episode):
+    return processed_comment_path(title, episode)
+
+def episode_file(title):
+    return os.path.join(EPISODE_DATA_DIR, f"{title}.json")
+
+def episode_db_state(title, episode):
+    """DB에 적재된 회차 row의 id와 댓글 수 (row가 없으면 None)"""
+    from db import get_connection
+
+    with get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT e.id, (SELECT count(*) FROM webtoon_comments c WHERE c.episode_id = e.id)
+            FROM webtoon_episodes e WHERE e.webtoon = %s AND e.episode = %s;
+        """, (title, episode))
+        row = cursor.fetchone()
+    return list(row) if row else None
+
+# stage별 입력 파일, 출력 파일, 결과에 영향을 주는 코드 파일
+# 입력/출력 함수는 (title, episode)를 받아 파일 경로 list를 반환한다.
+# 출력이 파일이 아닌 stage는 state 함수가 반환하는 값(예: DB row)으로 결과가 그대로인지 확인한다.
+# 회차 목록 파일은 batch에서 수집 전에 따로 갱신하므로 crawl의 출력에 넣지 않는다.
+STAGE_SPECS = {
+    "crawl": {
+        "inputs": lambda title, episode: [],
+        "outputs": lambda title, episode: [raw_file(title, episode)],
+        "code": ["crawler/extract_comments.py", "crawler/comment_api.py", "crawler/stream_pipeline.py"],
+    },
+    "transform": {
+        # trend 계산에 최근 TREND_WINDOW화의 요약 파일과 에피소드 별점 목록을 사용
+        "inputs": lambda title, episode: [raw_file(title, episode), episode_file(title)] + [
+            summary_path(title, ep) for ep in range(episode - (TREND_WINDOW - 1), episode)
+        ],
+        "outputs": lambda title, episode: [processed_file(title, episode), summary_path(title, episode)] + (
+            [get_parquet_path(title, episode)] if parquet_enabled() else []
+        ),
+        "code": ["crawler/transform_comments.py", "crawler/update_trend.py", "crawler/episode_summary.py",
+                 "sentiment/sentiment_predictor.py"],
+    },
+    "load": {
+        "inputs": lambda title, episode: [processed_file(title, episode)],
+        "outputs": lambda title, episode: [],
+        "state": episode_db_state,
+        "code": ["crawler/load_comments.py", "db.py"],
+    },
+    "visualize": {
+        "inputs": lambda title, episode: [processed_file(title, episode), STOPWORDS_FILE],
+        "outputs": lambda title, episode: [
+            os.path.join(VISUALIZED_IMAGE_DIR, f"{title}_{episode}_trend.png"),
+            os.path.join(VISUALIZED_IMAGE_DIR, f"{title}_{episode}_sentiment.png"),
+            os.path.join(WORDCLOUD_OUTPUT_DIR, f"{title}_{episode}_combined_wordcloud.png"),
+        ],
+        "code": ["visualize/visualize.py", "visualize/render.py", "crawler/make_wordcloud.py", "crawler/term_index.py"],
+    },
+    "report": {
+        "inputs": lambda title, episode: [processed_file(title, episode), PROMPT_FILE],
+        "outputs": lambda title, episode: [os.path.join(REPORTS_DIR, f"{title}_{episode}_gpt_report.md")],
+        "code": ["create_report/gptapi_report.py", "create_report/prompt_builder.py", "create_report/report_engine.py"],
+    },
+}
+
+
+def file_hash(file_path):
+    """파일 내용의 sha256 해시 (파일이 없으면 None)"""
+    if not file_path or not os.path.isfile(file_path):
+        return None
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageManifest:
+    """
+    (title, episode)의 stage마다 실행 당시의 입력 파일 해시, 코드/모델 버전, 출력 파일 해시를 기록한다.
+    다음 실행에서 입력과 코드/모델이 같고 출력 파일도 그대로 남아 있으면 해당 stage를 건너뛸 수 있다.
+    """
+
+    def __init__(self, path=STAGE_MANIFEST_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def fingerprint(self, stage, title, episode):
+        """stage 실행 전의 입력 파일 해시와 코드(및 모델) 버전"""
+        spec = STAGE_SPECS[stage]
+        code = hashlib.sha256()
+        for code_file in spec["code"]:
+            code.update((file_hash(os.path.join(ROOT_DIR, code_file)) or '').encode())
+        if stage == "transform":
+            code.update(get_model_identity(LOCAL_MODEL_PATH, SENTIMENT_BACKEND).encode())
+        return {
+            "inputs": {path: file_hash(path) for path in spec["inputs"](title, episode) if path},
+            "code": code.hexdigest(),
+        }
+
+    def is_fresh(self, stage, title, episode, fingerprint):
+        """기록된 실행 이후 입력, 코드/모델, 출력이 모두 그대로이면 True"""
+        with self._lock:
+            record = self._load().get(f"{title}_{episode}", {}).get(stage)
+        if record is None:
+            return False
+        if record["inputs"] != fingerprint["inputs"] or record["code"] != fingerprint["code"]:
+            return False
+        if stage == "crawl" and CRAWL_MAX_AGE_HOURS is not None and \
+                time.time() - record["recorded_at"] > CRAWL_MAX_AGE_HOURS * 3600:
+            return False
+        if "state" in STAGE_SPECS[stage] and record.get("state") != self.state(stage, title, episode):
+            return False
+        return all(file_hash(path) == digest for path, digest in record["outputs"].items())
+
+    @staticmethod
+    def state(stage, title, episode):
+        """파일이 아닌 stage 결과의 현재 상태 (확인할 수 없으면 None이므로 다시 실행됨)"""
+        try:
+            return STAGE_SPECS[stage]["state"](title, episode)
+        except Exception as e:
+            print(f"[LOG] {stage} 결과 확인 실패: {e}")
+            return None
+
+    def record(self, stage, title, episode, fingerprint):
+        """stage 실행 결과(출력 파일 해시와 state)를 fingerprint와 함께 기록"""
+        outputs = {path: file_hash(path) for path in STAGE_SPECS[stage]["outputs"](title, episode)}
+        state = self.state(stage, title, episode) if "state" in STAGE_SPECS[stage] else None
+        with self._lock:
+            manifest = self._load()
+            manifest.setdefault(f"{title}_{episode}", {})[stage] = {
+                **fingerprint,
+                "outputs": outputs,
+                "state": state,
+                "recorded_at": time.time(),
+            }
+            # 기록 도중 중단되어도 manifest 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
+
+
+def run_stage(manifest, name, stage, title, episode, options, force=(), runner=None, context=None):
+    """
+    stage의 입력이 바뀌었거나 force에 포함된 경우에만 실행하고 결과를 manifest에 기록한다.
+    incremental 수집은 새 댓글을 확인하는 것이 목적이므로 crawl stage를 항상 실행한다.
+    그 외의 crawl stage는 CRAWL_MAX_AGE_HOURS를 설정하지 않으면 --force crawl 전까지 마지막 수집 결과를 재사용한다.
+    runner가 주어지면 runner(stage, title, episode, options)로 실행한다 (예: process pool).
+    context(EpisodeContext)는 같은 process에서 실행할 때만 stage에 전달한다.
+
+    :return: 실제로 실행했으면 True, 건너뛰었으면 False
+    """
+    fingerprint = manifest.fingerprint(name, title, episode)
+    always_run = name in force or "all" in force or (name == "crawl" and options.get("incremental"))
+    if not always_run and manifest.is_fresh(name, title, episode, fingerprint):
+        return False
+    if runner is None:
+        stage(title, episode, options, context)
+    else:
+        runner(stage, title, episode, options)
+    manifest.record(name, title, episode, fingerprint)
+    return True
@@ -0,0 +1,177 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from functools import lru_cache
+from dotenv import load_dotenv
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+load_dotenv()
+
+# 전역 변수 설정
+FONT_PATH = os.getenv('FONT_PATH')
+# 차트/워드 클라우드를 그리는 process 수 (0이면 호출한 process에서 직접 그림)
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+color_mapping = {
+    'Positive': '#66b3ff',
+    'Negative': '#ff9999',
+    'Neutral': '#99ff99'
+}
+# Blue, Red, Green
+
+_pool = None
+_pool_lock = threading.Lock()
+# 원래의 PIL ImageFont.truetype (init_render_worker에서 cache하는 함수로 교체)
+_original_truetype = None
+
+
+def log(message):
+    print(f"[LOG] {message}")
+
+
+@lru_cache(maxsize=None)
+def _load_truetype(font, size, index, encoding, layout_engine):
+    return _original_truetype(font, size, index, encoding, layout_engine)
+
+def _cached_truetype(font=None, size=10, index=0, encoding="", layout_engine=None, **kwargs):
+    """폰트 파일 경로로 여는 경우 (경로, 크기)마다 한 번만 읽는다."""
+    if isinstance(font, str) and not kwargs:
+        return _load_truetype(font, size, index, encoding, layout_engine)
+    return _original_truetype(font, size, index, encoding, layout_engine, **kwargs)
+
+def init_render_worker():
+    """
+    render process 초기화: WordCloud가 글자 크기를 바꿀 때마다 FONT_PATH 폰트를 다시 읽지 않도록
+    PIL의 truetype을 process 안에서 cache하고, 자주 쓰는 WordCloud 객체를 미리 만든다.
+    """
+    global _original_truetype
+    from PIL import ImageFont
+    if _original_truetype is None:
+        _original_truetype = ImageFont.truetype
+        ImageFont.truetype = _cached_truetype
+    get_wordcloud(600, 600)
+
+@lru_cache(maxsize=None)
+def get_wordcloud(width, height):
+    """크기별 WordCloud 객체 (process당 한 번만 생성해 재사용)"""
+    from wordcloud import WordCloud
+    return WordCloud(width=width, height=height, background_color='white', font_path=FONT_PATH)
+
+
+def save_figure(fig, output_file):
+    """pyplot을 거치지 않고 Agg canvas로 저장 (fig는 참조가 사라지면 바로 해제됨)"""
+    FigureCanvasAgg(fig)
+    fig.savefig(output_file)
+    fig.clear()
+    return output_file
+
+def visualize_sentiment_pie(shares):
+    """shares: {reader_loyalty: {label: 비율}} (비율이 큰 순서대로 그림)"""
+    loyalty_reader = pd.Series(shares['일반 독자']).sort_values(ascending=False)
+    non_loyalty_reader = pd.Series(shares['충성 독자']).sort_values(ascending=False)
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots(1, 2)
+    ax[0].pie(loyalty_reader, autopct='%1.1f%%', startangle=140,
+              textprops={'fontsize': 12}, labels=loyalty_reader.index,
+              colors=[color_mapping[label] for label in loyalty_reader.index])
+    ax[1].pie(non_loyalty_reader, autopct='%1.1f%%', startangle=140,
+              textprops={'fontsize': 12}, labels=non_loyalty_reader.index,
+              colors=[color_mapping[label] for label in non_loyalty_reader.index])
+    ax[0].set_title('Loyalty Reader')
+    ax[1].set_title('Non-Loyalty Reader')
+    return fig
+
+def visualize_trend(trend_df):
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots(1, 2)
+    ax[0].plot(trend_df.index, trend_df["rating"], marker='o', linestyle='-', label="Rating")
+    ax[0].set_xlabel("Trend ID")
+    ax[0].set_ylabel("Rating")
+    ax[0].set_ylim(0, 10)
+    ax[0].set_title("Rating Trend")
+
+    ax[1].plot(trend_df.index, trend_df["negative_comment_ratio"], marker='s', linestyle='--', label="Negative Comment Ratio")
+    ax[1].set_xlabel("Trend ID")
+    ax[1].set_ylabel("Value")
+    ax[1].set_ylim(0, 100)
+    ax[1].set_title("Rating and Negative Comment Ratio Trend")
+    fig.suptitle("Trend Analysis")
+    return fig
+
+def trend_to_frame(trend):
+    """processed 데이터의 trend(dict)를 차트용 DataFrame으로 변환"""
+    trend_df = pd.DataFrame(trend).T
+    trend_df.index.name = 'Episode'
+    trend_df['rating'] = trend_df['rating'].astype(float)
+    trend_df['negative_comment_ratio'] = trend_df['negative_comment_ratio'].replace('N/A', 0).astype(float, errors='ignore')
+    return trend_df
+
+def render_trend(trend, output_file):
+    return save_figure(visualize_trend(trend_to_frame(trend)), output_file)
+
+def render_sentiment_pie(shares, output_file):
+    return save_figure(visualize_sentiment_pie(shares), output_file)
+
+def render_wordcloud(word_counts, width=600, height=600):
+    """단어 빈도로 워드 클라우드 이미지(numpy array)를 생성"""
+    return get_wordcloud(width, height).generate_from_frequencies(word_counts).to_array()
+
+def render_combined_wordcloud(positive_image, negative_image, output_file):
+    """긍정/부정 워드 클라우드 이미지를 하나의 PNG로 결합"""
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots(1, 2)
+
+    # 긍정 댓글 워드클라우드
+    ax[0].imshow(positive_image, interpolation='bilinear')
+    ax[0].set_title('Positive comments Word Cloud')
+    ax[0].axis('off')
+
+    # 부정 댓글 워드클라우드
+    ax[1].imshow(negative_image, interpolation='bilinear')
+    ax[1].set_title('Negative comments Word Cloud')
+    ax[1].axis('off')
+    return save_figure(fig, output_file)
+
+
+def get_render_pool():
+    """
+    렌더링 process pool (처음 호출할 때 생성)
+    RENDER_WORKERS가 0이거나 이미 다른 pool의 worker process 안(batch의 cpu stage)이면 None
+    """
+    global _pool
+    if RENDER_WORKERS <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=init_render_worker)
+            log(f"렌더링 process pool 생성 ({RENDER_WORKERS}개)")
+        return _pool
+
+def submit(fn, *args):
+    """렌더링 작업을 pool에 넘기고 Future를 반환 (pool을 쓰지 않으면 바로 실행한 결과를 담은 Future)"""
+    pool = get_render_pool()
+    if pool is not None:
+        return pool.submit(fn, *args)
+    init_render_worker()
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def submit_wordclouds(positive_word_counts, negative_word_counts):
+    """긍정/부정 워드 클라우드 이미지를 각각 render pool에서 만들고 Future 두 개를 반환 (결합은 호출한 쪽에서 render_combined_wordcloud로)"""
+    return [submit(render_wordcloud, positive_word_counts), submit(render_wordcloud, negative_word_counts)]
+
+def shutdown():
+    """렌더링 process pool 종료 (main.py/batch.py가 끝날 때 호출, 다시 submit하면 새로 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -1,130 +1,133 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 import argparse
-import psycopg2
 from dotenv import load_dotenv
 import os
+from db import get_connection, execute_prepared
+from crawler.comment_parquet import parquet_enabled, get_parquet_path, load_episode_comments
+from crawler.make_wordcloud import load_word_counts, submit_wordclouds, save_combined_wordcloud
+from visualize import render
 
 load_dotenv()
 
 VISUALIZED_IMAGE_DIR = os.getenv("VISUALIZED_IMAGE_DIR")
 
-color_mapping = {
-    'Positive': '#66b3ff',
-    'Negative': '#ff9999',
-    'Neutral': '#99ff99'
-}
-# Blue, Red, Green
-
-def connect_db():
-    """ PostgreSQL 연결 및 테이블 생성 """
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    cursor = conn.cursor()
-
-    # ✅ 테이블이 없으면 자동 생성
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS webtoon_episodes (
-        id SERIAL PRIMARY KEY,
-        webtoon VARCHAR(255) NOT NULL,
-        episode INT NOT NULL,
-        interest_count INT,
-        like_count INT,
-        rating FLOAT,
-        trend JSONB,  -- 최근 5화의 별점 & 부정 댓글 비율 저장
-        comments JSONB, -- 댓글 전체를 JSON 형태로 저장
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE (webtoon, episode)  -- 중복 방지
-    );
-    """
-    cursor.execute(create_table_query)
-    conn.commit()
-    cursor.close()
-
-    return conn
-
-def visualize_sentiment_pie(comments_df, threshold):
-    comments_df['label'] = comments_df['sentiment_score'].apply(
+# 독자층(reader_loyalty)별 긍정/중립/부정 댓글 비율을 DB에서 계산 ($3: threshold)
+SENTIMENT_SHARE_STATEMENT = "visualize_sentiment_share"
+SENTIMENT_SHARE_QUERY = """
+    PREPARE visualize_sentiment_share (text, int, double precision) AS
+    SELECT reader_loyalty, label, count(*)::double precision / sum(count(*)) OVER (PARTITION BY reader_loyalty) AS share
+    FROM (
+        SELECT reader_loyalty,
+               CASE WHEN sentiment_score >= $3 THEN 'Positive'
+                    WHEN sentiment_score >= -$3 THEN 'Neutral'
+                    ELSE 'Negative' END AS label
+        FROM webtoon_comments
+        WHERE webtoon = $1 AND episode = $2
+    ) labeled
+    GROUP BY reader_loyalty, label
+    ORDER BY reader_loyalty, share DESC;
+"""
+
+def sentiment_shares_from_frame(comments_df, threshold):
+    """댓글 DataFrame에서 독자층별 {label: 비율}을 계산 (DB 집계 결과와 같은 형태)"""
+    labels = comments_df['sentiment_score'].apply(
         lambda x: 'Positive' if x >= threshold else ('Neutral' if x >= -1 * threshold else 'Negative')
     )
-    readers_comment_df = comments_df.groupby('reader_loyalty')['label'].value_counts(normalize=True)
-    loyalty_reader = readers_comment_df['일반 독자']
-    non_loyalty_reader = readers_comment_df['충성 독자']
-    fig, ax = plt.subplots(1, 2, figsize=(12, 6))
-    ax[0].pie(loyalty_reader, autopct='%1.1f%%', startangle=140,
-              textprops={'fontsize': 12}, labels=loyalty_reader.index,
-              colors=[color_mapping[label] for label in loyalty_reader.index])
-    ax[1].pie(non_loyalty_reader, autopct='%1.1f%%', startangle=140,
-              textprops={'fontsize': 12}, labels=non_loyalty_reader.index,
-              colors=[color_mapping[label] for label in non_loyalty_reader.index])
-    ax[0].set_title('Loyalty Reader')
-    ax[1].set_title('Non-Loyalty Reader')
-    return fig
-
-def visualize_trend(trend_df):
-    fig, ax = plt.subplots(1, 2, figsize=(12, 6))
-    ax[0].plot(trend_df.index, trend_df["rating"], marker='o', linestyle='-', label="Rating")
-    ax[0].set_xlabel("Trend ID")
-    ax[0].set_ylabel("Rating")
-    ax[0].set_ylim(0, 10)
-    ax[0].set_title("Rating Trend")
-
-    ax[1].plot(trend_df.index, trend_df["negative_comment_ratio"], marker='s', linestyle='--', label="Negative Comment Ratio")
-    ax[1].set_xlabel("Trend ID")
-    ax[1].set_ylabel("Value")
-    ax[1].set_ylim(0, 100)
-    ax[1].set_title("Rating and Negative Comment Ratio Trend")
-    fig.suptitle("Trend Analysis")
-    return fig
-
-def load_trend_and_comments_from_db(title, episode_num):
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        SELECT trend ,comments FROM webtoon_episodes 
-        WHERE webtoon = '{title}' 
-        AND episode = {episode_num};
-    """)
-    data = cursor.fetchall()
-    trend, comments = data[0]
-    return trend, comments
-
-def visualize(title, episode_num):
-    """ 전체 시각화 실행 함수 """
-    trend, comments = load_trend_and_comments_from_db(title, episode_num)
-    if trend is None or comments is None:
+    readers_comment_df = labels.groupby(comments_df['reader_loyalty']).value_counts(normalize=True)
+    return {
+        loyalty: readers_comment_df[loyalty].to_dict()
+        for loyalty in readers_comment_df.index.get_level_values(0).unique()
+    }
+
+def load_trend_and_shares_from_db(title, episode_num, threshold):
+    """trend와 독자층별 감정 비율만 DB에서 가져옴 (댓글은 Python으로 가져오지 않음)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT trend FROM webtoon_episodes WHERE webtoon = %s AND episode = %s;", (title, episode_num))
+        row = cursor.fetchone()
+        if row is None:
+            return None, None
+        execute_prepared(cursor, SENTIMENT_SHARE_STATEMENT, SENTIMENT_SHARE_QUERY, (title, episode_num, threshold))
+        shares = {}
+        for loyalty, label, share in cursor.fetchall():
+            shares.setdefault(loyalty, {})[label] = share
+    return row[0], shares or None
+
+def load_trend_from_db(title, episode_num):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT trend FROM webtoon_episodes WHERE webtoon = %s AND episode = %s;", (title, episode_num))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def load_chart_data(title, episode_num, data=None, threshold=0.6):
+    """
+    차트에 필요한 (trend, 독자층별 감정 비율)을 가져옴 (data(processed 데이터)가 주어지면 DB를 조회하지 않음)
+    회차의 Parquet 파일이 있으면 DB에서는 trend만 가져오고, 댓글은 필요한 column만 Parquet에서 읽는다.
+    둘 다 아니면 감정 비율을 DB에서 집계해 집계 결과만 가져온다.
+    """
+    if data is not None:
+        trend = data.get("trend")
+        comments = data.get("comments")
+        shares = sentiment_shares_from_frame(pd.DataFrame(comments), threshold) if comments else None
+    elif parquet_enabled() and os.path.exists(get_parquet_path(title, episode_num)):
+        trend = load_trend_from_db(title, episode_num)
+        comments_df = load_episode_comments(title, episode_num, columns=["sentiment_score", "reader_loyalty"])
+        shares = sentiment_shares_from_frame(comments_df, threshold)
+    else:
+        trend, shares = load_trend_and_shares_from_db(title, episode_num, threshold)
+    return trend, shares
+
+def submit_charts(title, episode_num, trend, shares):
+    """trend 차트와 감정 비율 파이 차트 렌더링을 render pool에 넘김"""
+    output_dir = VISUALIZED_IMAGE_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    return [
+        render.submit(render.render_trend, trend, f"{output_dir}/{title}_{episode_num}_trend.png"),
+        render.submit(render.render_sentiment_pie, shares, f"{output_dir}/{title}_{episode_num}_sentiment.png"),
+    ]
+
+def visualize(title, episode_num, data=None, threshold=0.6):
+    """전체 시각화 실행 함수 (trend 차트, 독자층별 감정 파이 차트)"""
+    trend, shares = load_chart_data(title, episode_num, data, threshold)
+    if trend is None or shares is None:
         print(f"[ERROR] {title} {episode_num}화 데이터가 존재하지 않습니다.")
         return
 
-    # 트렌드 데이터 변환
-    trend_df = pd.DataFrame(trend).T
-    trend_df.index.name = 'Episode'
-    trend_df['rating'] = trend_df['rating'].astype(float)
-    trend_df['negative_comment_ratio'] = trend_df['negative_comment_ratio'].replace('N/A', 0).astype(float, errors='ignore')
-
-    # 시각화 실행
-    trend_fig = visualize_trend(trend_df)
-    comments_df = pd.DataFrame(comments)
-    sentiment_fig = visualize_sentiment_pie(comments_df, 0.6)
+    # 시각화 실행 및 결과 저장
+    for future in submit_charts(title, episode_num, trend, shares):
+        future.result()
+    print(f"[INFO] 시각화 결과 저장 완료: {VISUALIZED_IMAGE_DIR}")
 
-    # 결과 저장
-    output_dir = VISUALIZED_IMAGE_DIR
-    os.makedirs(output_dir, exist_ok=True)
-    trend_fig.savefig(f"{output_dir}/{title}_{episode_num}_trend.png")
-    sentiment_fig.savefig(f"{output_dir}/{title}_{episode_num}_sentiment.png")
+def render_episode(title, episode_num, data=None, threshold=0.6):
+    """
+    회차의 모든 PNG(trend, 감정 파이 차트, 긍정/부정 워드 클라우드)를 render pool에서 동시에 그림
+    데이터를 먼저 모두 준비한 뒤 렌더링 작업만 process로 보낸다.
+    """
+    trend, shares = load_chart_data(title, episode_num, data, threshold)
+    positive_word_counts, negative_word_counts, output_name = load_word_counts(title, episode_num, data)
 
-    print(f"[INFO] 시각화 결과 저장 완료: {output_dir}")
+    futures = []
+    if trend is None or shares is None:
+        print(f"[ERROR] {title} {episode_num}화 데이터가 존재하지 않습니다.")
+    else:
+        futures += submit_charts(title, episode_num, trend, shares)
+    wordcloud_futures = submit_wordclouds(positive_word_counts, negative_word_counts)
+    # 두 워드 클라우드 이미지가 끝나면 결합한 PNG는 이 thread에서 저장
+    output_file = save_combined_wordcloud(wordcloud_futures, output_name)
+    for future in futures:
+        future.result()
+    print(f"[INFO] 시각화 결과 저장 완료: {VISUALIZED_IMAGE_DIR}")
+    print(f"워드 클라우드가 {output_file}로 저장되었습니다.")
 
 def main():
     """ 단독 실행 시 기본 실행 함수 """
     title = '김부장'
     episode = 167
-    visualize(title, episode)
+    try:
+        visualize(title, episode)
+    finally:
+        render.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file